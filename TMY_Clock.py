@@ -8,53 +8,72 @@ try:
 except:
 	import tkinter as Tkinter
 
-import math	# Required For Coordinates Calculation
 from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
 from pytz import utc, timezone
 from timezones import timezones
 
-from pvlib import iotools
+from tmy_cache import default_cache
+from scheduler import FrameScheduler
+from clock_render import ClockRenderer
+from clock_window import ClockWindow
+from instrumentation import profiler
+from time_source import NS, RealTimeSource
 
-class TMY_Clock(Tkinter.Tk):
-    """"""
-    def __init__(self, lat=39.13, lng=-77.21, speed=1, starttime=datetime.now(), endtime=datetime.now() + timedelta(weeks=2), nosecond=False):
+# length of the TMY year, the data is coerced to 2000 which is a leap year
+TMY_YEAR = timedelta(days=366)
+
+# clear sky ghi under which an hour's clear sky index is not trusted, around sunrise and sunset
+CLEARSKY_MIN = 50.0
+
+class TMY_Clock(ClockWindow, Tkinter.Tk):
+    """ Tk window that renders a ClockEngine as an analog clock face, the face brightness follows the TMY ghi"""
+    def __init__(self, lat=39.13, lng=-77.21, speed=1, starttime=None, endtime=None, nosecond=False, module=None, source=None):
         """
 
         :param speed:  Time multiplier
-        :param starttime:  Datetime to start the clock
-        :param endtime:   Datetime to pause the clock at the end of the run
+        :param starttime:  Datetime to start the clock, defaults to now
+        :param endtime:   Datetime to pause the clock at the end of the run, defaults to two weeks after the starttime
         :param nosecond:  Bool to remove the second hand
+        :param module:  Optional SandiaMod module (pandas Series), the clock then has its IV curve in self.curve
+        :param source:  Time source of the engine, defaults to the real time
         """
-        Tkinter.Tk.__init__(self)
+        if starttime is None:
+            starttime = datetime.now()
+        if endtime is None:
+            endtime = starttime + timedelta(weeks=2)
         self.x = 154    # Center point x
         self.y = 154    # center point y
         self.length = [100,125,125]  # stick length
         self.width = [4,2,1]
         self.color = 254
-        self.speed = speed
         self.nosecond = nosecond
-        self.then = []
-        self.displaytime = []
-        self.tz = timezone(timezones(lat, lng).tz)
-        self.starttime = self.tz.localize(starttime.replace(year=2000))
-        self.endtime = self.tz.localize(endtime.replace(year=2000))
-        self.elapsed = timedelta()
+
+        # the simulation, gets the tmy data
+        self.engine = ClockEngine.for_location(lat, lng, starttime, endtime, speed, source=source)
+        self.tz = self.engine.tz
+        self.tmy = self.engine.tmy
+        self.tmy_slice = self.tmy.tmy_slice
+        self.set_module(module)
+
+        # build the minute ghi series now rather than on the first frame
+        self.tmy.minute_series()
+
+        # the window opens once the engine is built, a failed fetch leaves no empty window behind
+        Tkinter.Tk.__init__(self)
         self.creating_all_function_trigger()
         self.title('TMY Clock')
-        self.pause = False
-
-        # get the tmy data
-        self.tmy_slice = tmy(lat=lat, lng=lng, tz=self.tz, daterange=[self.starttime, self.endtime]).tmy_slice
 
         #self.iconphoto(False, Tkinter.PhotoImage(file='GS-PV-array-icon.png'))
 
-
     # Creating Trigger for other functions
     def creating_all_function_trigger(self):
         self.create_canvas_for_shapes()
         self.creating_background_()
         self.creating_sticks()
         self.creating_datelabel()
+        self.renderer = ClockRenderer(self.canvas, self.clkface, self.sticks, self.datelabel, self.x, self.y, self.length)
         return
 
     # creating canvas
@@ -88,159 +107,425 @@ class TMY_Clock(Tkinter.Tk):
         return
 
     def update_class(self):
-        now = datetime.now()
-        if self.pause:
-            self.then = now
-        if self.displaytime == []:
-            self.displaytime = self.starttime
-        else:
-            elapsed = now - self.then
-            self.elapsed += elapsed * self.speed
-            self.displaytime = self.starttime + self.elapsed
+        with profiler.phase('advance'):
+            self.engine.advance()
 
-        self.then = now
-        #t = time.strptime(str(self.displaytime.tm_hour), "%H")
-        #hour = int(time.strftime('%I', t))*5
-        hour = int(self.displaytime.strftime('%I')) * 5
-        min = int(self.displaytime.strftime('%M'))
-        sec = int(self.displaytime.strftime('%S'))
-        now=(hour,min,sec)
-
-        # changing the sticks coordinates continuously
-        # Hour stick
-        x, y = self.canvas.coords(self.sticks[0])[0:2]
-        cr = [x,y]
-        cr.append(self.length[0] * math.cos(math.radians((now[0] * 6) + (now[1] * 6) / 12) - math.radians(90)) + self.x)
-        cr.append(self.length[0] * math.sin(math.radians((now[0] * 6) + (now[1] * 6) / 12) - math.radians(90)) + self.x)
-        self.canvas.coords(self.sticks[0], tuple(cr))
-
-        # minute stick
-        x, y = self.canvas.coords(self.sticks[1])[0:2]
-        cr = [x,y]
-        cr.append(self.length[1] * math.cos(math.radians((now[1] * 6) + (now[2] * 6) / 60) - math.radians(90)) + self.x)
-        cr.append(self.length[1] * math.sin(math.radians((now[1] * 6) + (now[2] * 6) / 60) - math.radians(90)) + self.x)
-        self.canvas.coords(self.sticks[1], tuple(cr))
-
-        # second stick
-        if not self.nosecond:
-            x, y = self.canvas.coords(self.sticks[2])[0:2]
-            cr = [x, y]
-            cr.append(self.length[2] * math.cos(math.radians((now[2] * 6)) - math.radians(90)) + self.x)
-            cr.append(self.length[2] * math.sin(math.radians((now[2] * 6)) - math.radians(90)) + self.x)
-            self.canvas.coords(self.sticks[2], tuple(cr))
-
-        # Determine the face color based on a linear interpolation of the ghi data
-        time = (self.displaytime.replace(minute=0, second=0, microsecond=0))
-        tmy_rows = self.tmy_slice.loc[time : time + timedelta(hours=1)]
-        seek = (self.displaytime.timestamp() % 3600) / 3600
-        X, Y = self.interpolate(
-            tmy_rows.index[0].timestamp(),
-            tmy_rows.iloc[0]['ghi'],
-            tmy_rows.index[1].timestamp(),
-            tmy_rows.iloc[1]['ghi'],
-            seek
-        )
-
-        self.change_color(int(round((Y/1000)*256)))
-
-        # update the date
+        # the date
         txt = self.displaytime.strftime('%B %d')
         if self.pause:
             txt += ' (paused)'
-        self.datelabel.config(text=txt)
-        self.datelabel.update()
 
-        # pause after endtime
-        if self.displaytime > self.endtime:
-            self.pause = True
+        # the face color: ghi of the display minute, one index into the precomputed minute series (the hourly
+        # clear sky index interpolated to the minutes, times the clear sky ghi), mapped to a grey level
+        with profiler.phase('ghi lookup'):
+            ghi = self.engine.ghi()
+        with profiler.phase('colour'):
+            color = self.engine.grey(ghi)
 
-        return
+        # hands from the precomputed tables.
+        # Only what changed since the last frame is sent to Tk, self.renderer.calls counts the Tk calls
+        with profiler.phase('redraw'):
+            self.renderer.draw(self.displaytime, color, txt)
+        profiler.count('tk calls', self.renderer.calls)
 
-    def change_color(self,color):
-        bg = '#'+bytes([color,color,color]).hex()
-        self.canvas.itemconfig(self.clkface, fill=bg)
         return
 
+    def set_module(self, module):
+        """ Rebuilds only the IV curves for another module, the clock and its run are kept.
+
+        :param module: SandiaMod module (pandas Series), or None for no IV curves
+        """
+        if module is None:
+            self.engine.iv = None
+        else:
+            from iv_engine import IVEngine
+            self.engine.iv = IVEngine(module, self.tmy, self.tmy.lat, self.tmy.lng)
+
+    @property
+    def curve(self):
+        """ (v, i) points of the module IV curve at the display time, None without a module.  Computed when read"""
+        if self.engine.iv is None:
+            return None
+        return self.engine.iv_curve()
+
+class ClockEngine:
+    """
+    The clock simulation without any rendering: advances the displayed time from a time source times the speed
+    multiplier, pauses exactly at the endtime, and samples the TMY ghi for the face colour.  The simulated time is
+    kept in integer nanoseconds so long accelerated runs don't drift.
+
+    The display time cycles through the local year 2000, from Dec 31 it continues on Jan 1, so a run can cross new
+    year, last a full year, or with no endtime loop indefinitely.  An endtime before the starttime is in the next year.
+
+    advance() moves one frame, the batch methods step_frames() and evaluate() work on numpy arrays of display times
+    so long accelerated runs can be simulated or profiled without Tk.
+    """
+    def __init__(self, tmydata, starttime, endtime=None, speed=1, source=None):
+        """
+        :param tmydata:   tmy object of the location
+        :param starttime: tz aware datetime the clock starts at
+        :param endtime:   tz aware datetime the clock pauses at, None to run indefinitely
+        :param speed:     Time multiplier
+        :param source:    time_source object the wall time is read from, defaults to RealTimeSource
+        """
+        self.tmy = tmydata
+        self.tz = tmydata.tz
+        self.starttime = starttime
+        self.endtime = endtime
+        self.speed = speed
+        self.source = source if source is not None else RealTimeSource()
+        self.iv = None      # optional IVEngine of a module at this location
+
+        # the local calendar year the display time cycles through
+        self.year_start = self.tz.localize(datetime(2000, 1, 1)).timestamp()
+        self.year = self.tz.localize(datetime(2001, 1, 1)).timestamp() - self.year_start
+
+        # simulated seconds, and integer nanoseconds, until the clock pauses
+        if endtime is None:
+            self.span = None
+            self.span_ns = None
+        else:
+            span = endtime - starttime
+            if span <= timedelta():
+                span += TMY_YEAR
+            self.span = span.total_seconds()
+            self.span_ns = (span // timedelta(microseconds=1)) * 1000
+        self.reset()
+
+    @classmethod
+    def for_location(cls, lat, lng, starttime, endtime, speed=1, source=None, **kwargs):
+        """ Resolves the timezone, moves the naive start and end times to the year 2000 and gets the tmy data"""
+        tz = timezone(timezones(lat, lng).tz)
+        starttime, endtime = cls.localize_run(tz, starttime, endtime)
+        tmydata = tmy(lat=lat, lng=lng, tz=tz, **kwargs)
+        return cls(tmydata, starttime, endtime, speed, source)
+
+    @staticmethod
+    def localize_run(tz, starttime, endtime):
+        """ Naive start and end times moved to the year 2000 in tz"""
+        starttime = tz.localize(starttime.replace(year=2000))
+        if endtime is not None:
+            endtime = tz.localize(endtime.replace(year=2000))
+        return starttime, endtime
+
+    def restarted(self, starttime, endtime, speed=None):
+        """ A new engine for another run over the same tmy data, time source and IV curves, nothing is refetched.
+
+        :param starttime: naive datetime
+        :param endtime:   naive datetime, or None to run indefinitely
+        :param speed:     Time multiplier, defaults to this engine's
+        """
+        starttime, endtime = self.localize_run(self.tz, starttime, endtime)
+        engine = ClockEngine(self.tmy, starttime, endtime, self.speed if speed is None else speed, self.source)
+        engine.iv = self.iv
+        return engine
+
+    def reset(self):
+        """ Back to the starttime, running"""
+        self.pause = False
+        self.then = None
+        self.elapsed_ns = 0
+        self.displaytime = self.starttime
+
+    @property
+    def elapsed(self):
+        """ Simulated time since the start as a timedelta"""
+        return timedelta(microseconds=self.elapsed_ns // 1000)
+
+    @property
+    def elapsed_seconds(self):
+        return self.elapsed_ns / NS
+
+    def advance(self, now=None):
+        """ Moves the display time by the wall time since the last call times the speed.
+
+        :param now: wall time of this frame in integer nanoseconds, defaults to the time source's
+        :return: the new display time
+        """
+        if now is None:
+            now = self.source.now_ns()
+        if self.then is not None and not self.pause:
+            # exact for integer speeds, one rounding per frame otherwise
+            self.elapsed_ns += round((now - self.then) * self.speed)
+
+            # pause at the endtime, the last frame shows it exactly
+            if self.span_ns is not None and self.elapsed_ns >= self.span_ns:
+                self.elapsed_ns = self.span_ns
+                self.pause = True
+            self.displaytime = datetime.fromtimestamp(self.display_epoch(self.elapsed_seconds), self.tz)
+        self.then = now
+        return self.displaytime
+
+    def seek(self, elapsed_ns):
+        """ Jumps to elapsed_ns simulated nanoseconds after the start, pausing at the endtime if it is past it"""
+        elapsed_ns = max(0, int(elapsed_ns))
+        if self.span_ns is not None and elapsed_ns >= self.span_ns:
+            elapsed_ns = self.span_ns
+            self.pause = True
+        self.elapsed_ns = elapsed_ns
+        self.then = None
+        self.displaytime = datetime.fromtimestamp(self.display_epoch(self.elapsed_seconds), self.tz)
+        return self.displaytime
+
+    def display_epoch(self, elapsed):
+        """ Display time as epoch seconds after elapsed simulated seconds, wrapped into the year.  Works on arrays"""
+        return self.year_start + (self.starttime.timestamp() + elapsed - self.year_start) % self.year
+
+    def hand_angles(self, displaytime=None):
+        """ Hour, minute and second hand angles in degrees clockwise from 12"""
+        if displaytime is None:
+            displaytime = self.displaytime
+        hour, minute, second = displaytime.hour % 12, displaytime.minute, displaytime.second
+        return hour * 30 + minute / 2, minute * 6 + second / 10, second * 6
+
+    def ghi(self, displaytime=None):
+        if displaytime is None:
+            displaytime = self.displaytime
+        return self.tmy.ghi_at(displaytime.timestamp())
+
+    def iv_curve(self, displaytime=None):
+        """ (v, i) arrays of the SAPM curve points of the module at the display time"""
+        if displaytime is None:
+            displaytime = self.displaytime
+        return self.iv.curve_at(displaytime.timestamp())
+
+    def face_color(self, displaytime=None):
+        """ Grey level 0-255 of the clock face, 1000 W/m2 is full white"""
+        return self.grey(self.ghi(displaytime))
+
     @staticmethod
-    def interpolate(x1, y1, x2, y2, seek):
-        X = x1 + ((x2-x1)*seek)
-        Y = y2 + (y2-y1)*(X - x2)/(x2 - x1)
-        return(X,Y)
+    def grey(ghi):
+        return min(max(int(round(ghi / 1000 * 256)), 0), 255)
+
+    def step_frames(self, n, frame_interval):
+        """ Advances n frames of frame_interval wall seconds each without waiting for the time source, the same
+        steps advance() takes with a FixedStepSource(frame_interval).
+
+        :return: float64 array of the display time of each frame as epoch seconds
+        """
+        if self.pause:
+            elapsed = np.full(n, self.elapsed_ns, dtype=np.int64)
+        else:
+            step = round(int(round(frame_interval * NS)) * self.speed)
+            elapsed = self.elapsed_ns + np.arange(1, n + 1, dtype=np.int64) * step
+            # the frames reaching the endtime show it exactly, then the clock pauses
+            if self.span_ns is not None and n and elapsed[-1] >= self.span_ns:
+                np.minimum(elapsed, self.span_ns, out=elapsed)
+                self.pause = True
+        epoch = self.display_epoch(elapsed / NS)
+        if n:
+            self.elapsed_ns = int(elapsed[-1])
+            self.displaytime = datetime.fromtimestamp(epoch[-1], self.tz)
+        self.then = None
+        return epoch
+
+    def evaluate(self, epoch):
+        """ Hand angles and face colour for an array of display times in one vectorized pass.
+
+        :param epoch: array of display times as epoch seconds
+        :return: dict of numpy arrays 'hour', 'minute', 'second' (degrees), 'ghi' and 'color'
+        """
+        epoch = np.asarray(epoch, dtype=np.float64)
+        local = pd.to_datetime(epoch, unit='s', utc=True).tz_convert(self.tz)
+        hour = local.hour.to_numpy() % 12
+        minute = local.minute.to_numpy()
+        second = local.second.to_numpy()
+        ghi = self.tmy.ghi_many(epoch)
+        return {
+            'hour': hour * 30 + minute / 2,
+            'minute': minute * 6 + second / 10,
+            'second': second * 6.0,
+            'ghi': ghi,
+            'color': np.clip(np.rint(ghi / 1000 * 256), 0, 255).astype(np.uint8),
+        }
+
 
 class tmy():
     """
-    Gets Typical meterological year from PVGIS and stores the dat for the days of interest.
+    Gets Typical meterological year from PVGIS and stores it as one cyclic year.
 
-    The constructor takes the lat and long and the range of dates as a list of datetime objects: [startdate, enddate].  The first thing the constructor will do is fetch the
-    TMY data from the PVGIS online database.  Next it will coerce the time series to the year 2000.
-    The data is all in UTC time and is timezone aware, the daterange may or may not be timezone aware so if not, the lat
-    and lng will be used to determine the timezone
+    The constructor takes the lat and long.  The first thing the constructor will do is fetch the TMY data from the
+    PVGIS online database, or from the local tmy_cache if the location was fetched before.  Next it will coerce the time
+    series to the year 2000.  The data is all in UTC time and is timezone aware, it is localized to tz, or to the
+    timezone of the lat and lng if no tz is given.
+
+    The whole year is kept (tmy_slice, 8784 hourly rows with Feb 29 filled in) and looked up modulo the year, so any
+    date range, including one crossing new year or longer than a year, is served without reslicing.
+
+    The ghi the clock shows comes from a minute resolution series of the year (minute_series), the hourly values
+    interpolated as a clear sky index so the brightness follows the sun's elevation through sunrise and sunset.
+    The other columns are interpolated linearly between the hours.
     """
-    def __init__(self, lat=39.13, lng=-77.21, tz = timezone(timezones(39.13, -77.21).tz), daterange=[datetime.now().replace(year=2000), datetime.now().replace(year=2000) + timedelta(days=1)]):
+    def __init__(self, lat=39.13, lng=-77.21, tz=None, tmydata=None, cache=None):
+        """
+        :param tmydata:  Already fetched PVGIS tmy tuple, skips the download when given
+        :param cache:    tmy_cache to fetch through, defaults to the shared tmy_cache.default_cache
+        :param tz:       pytz timezone the year is localized to, looked up from the lat and lng if not given
+        """
 
-        # get the TMY data for the lat and long
-        tmydata = iotools.get_pvgis_tmy(lat, lng, map_variables=True)
+        # get the TMY data for the lat and long, from the local cache when it has been seen before
+        if tmydata is None:
+            if cache is None:
+                cache = default_cache
+            tmydata = cache.get(lat, lng)
         tmydata = self.coerce_tmy_year(tmydata)
 
-        # coerce the daterange into the desired timezone
+        # the local timezone of the location
+        if tz is None:
+            tz = timezone(timezones(lat, lng).tz)
         self.tz = tz
-        #self.daterange = self.coerce_daterange_year(daterange)
-        if daterange[0].tzinfo is None or daterange[0].utcoffset() is None:
-            daterange[0] = self.tz.localize(daterange[0])
-            daterange[1] = self.tz.localize(daterange[1])
 
-        # we need to convert the localized daterange to UTC time to get the correct tmy slice
-        daterange_utc = self.local_to_utc(daterange)
-
-        # get the slice of TMY data for the date range
-        self.tmy_slice = tmydata[0][daterange_utc[0] - timedelta(hours=3):daterange_utc[1] + timedelta(hours=3)]
+        # keep the whole year, the lookups wrap around it
+        self.tmy_slice = self.fill_leap_day(tmydata[0])
 
         # these times are in UTC so we need to localize them
         self.tmy_slice.index = self.tmy_slice.index.tz_convert(self.tz)
         self.tmy_slice.index = self.round_to_nearest_hour(self.tmy_slice.index)
 
+        # compact copies of the year so the per frame lookup doesn't touch pandas, the first row is repeated one
+        # year later to close the cycle
+        self.epoch, self.ghi = self.slice_arrays(self.tmy_slice)
+        self.base = int(self.epoch[0])
+        self.period = int(TMY_YEAR.total_seconds())
+        self._epoch = np.append(self.epoch, self.base + self.period)
+        self._ghi = np.append(self.ghi, self.ghi[0])
+        self._columns = {}      # other columns closed the same way, built on first use
+        self._row = 0
+        self.lat = lat
+        self.lng = lng
+        self._minutes = None    # float32 ghi of every minute of the year, built on first use
+
     @staticmethod
-    def coerce_tmy_year(tmydata):
-        """ The TMY timeseries takes months of data from different years, this wil coerce them all to 2000 so we can
-            later pick a range of dates
+    def slice_arrays(tmy_slice):
+        """ Returns contiguous numpy arrays of the slice index as epoch seconds (int64) and the ghi column (float64)"""
+        epoch = np.array(tmy_slice.index.tz_convert(utc).tz_localize(None), dtype='datetime64[s]').astype(np.int64)
+        ghi = np.ascontiguousarray(tmy_slice['ghi'].to_numpy(dtype=np.float64))
+        return epoch, ghi
+
+    def wrap(self, timestamp):
+        """ The POSIX timestamp moved into the TMY year, works on arrays"""
+        return self.base + (timestamp - self.base) % self.period
+
+    def ghi_at(self, timestamp):
+        """ ghi of the minute holding a POSIX timestamp, any year"""
+        return float(self.minute_series()[int((timestamp - self.base) % self.period) // 60])
+
+    def row_at(self, timestamp, wrapped=False):
+        """ Index of the tmy_slice row at or before a POSIX timestamp, any year"""
+        if not wrapped:
+            timestamp = self.wrap(timestamp)
+        epoch = self._epoch
+        i = self._row
+        if not epoch[i] <= timestamp < epoch[i + 1]:
+            i = int(np.searchsorted(epoch, timestamp, side='right')) - 1
+            i = min(max(i, 0), len(epoch) - 2)
+            self._row = i
+        return i
+
+    def ghi_many(self, timestamps):
+        """ ghi_at for an array of POSIX timestamps"""
+        minutes = self.minute_series()
+        offset = (np.asarray(timestamps, dtype=np.float64) - self.base) % self.period
+        return minutes[np.minimum(offset // 60, len(minutes) - 1).astype(np.intp)].astype(np.float64)
+
+    def values_many(self, column, timestamps):
+        """ Linear interpolation of any tmy_slice column (ghi, dni, dhi, temp_air, ...) between the hours at an array of
+            POSIX timestamps
         """
-        data_ymd = tmydata[0].index
-        data_ymd = data_ymd.map(lambda datetime: datetime.replace(year=2000))
-        tmydata[0].index = data_ymd
-        return tmydata
+        if column == 'ghi':
+            values = self._ghi
+        else:
+            values = self._columns.get(column)
+            if values is None:
+                values = self.tmy_slice[column].to_numpy(dtype=np.float64)
+                values = self._columns[column] = np.append(values, values[0])
+        return np.interp(self.wrap(np.asarray(timestamps, dtype=np.float64)), self._epoch, values)
+
+    def minute_series(self):
+        """ ghi of every minute of the year as float32, 366 x 1440 values (2.1 MB), built once.
+
+            The clear sky index (ghi / clear sky ghi) of the hours with the sun up is interpolated to the minutes and
+            multiplied back by each minute's clear sky ghi, so the series passes through the hourly values and is zero
+            when the sun is down.
+        """
+        if self._minutes is None:
+            epoch = self.base + 60 * np.arange(self.period // 60, dtype=np.int64)
+            clearsky = self.clearsky_ghi(epoch, self.lat, self.lng)
+            hourly = self.clearsky_ghi(self._epoch, self.lat, self.lng)
+            up = hourly > CLEARSKY_MIN
+            if up.any():
+                index = np.interp(epoch, self._epoch[up], self._ghi[up] / hourly[up])
+            else:
+                index = np.zeros(len(epoch))
+            self._minutes = (clearsky * np.clip(index, 0, None)).astype(np.float32)
+        return self._minutes
 
+    @staticmethod
+    def clearsky_ghi(epoch, lat, lng):
+        """ Haurwitz clear sky ghi at an array of POSIX timestamps, from pvlib's analytical solar position"""
+        from pvlib import solarposition
+
+        epoch = np.asarray(epoch, dtype=np.int64)
+        day, second = np.divmod(epoch, 86400)
+        days = np.arange(day.min(), day.max() + 1)
+        dayofyear = pd.to_datetime(days * 86400, unit='s').dayofyear.to_numpy()
+        equation_of_time = solarposition.equation_of_time_spencer71(dayofyear)[day - days[0]]
+        declination = solarposition.declination_spencer71(dayofyear)[day - days[0]]
+        hour_angle = 15 * (second / 3600 - 12) + lng + equation_of_time / 4
+        zenith = solarposition.solar_zenith_analytical(np.radians(lat), np.radians(hour_angle), declination)
+        cos_zenith = np.cos(zenith)
+        with np.errstate(divide='ignore', over='ignore'):
+            return np.where(cos_zenith > 0, 1098 * cos_zenith * np.exp(-0.059 / cos_zenith), 0.0)
 
     @staticmethod
-    def coerce_daterange_year(dt):
-        for i in range(len(dt)):
-            dt[i] = dt[i].replace(year=2000)
-        return dt
+    def fill_leap_day(data):
+        """ PVGIS years have 8760 rows, with no Feb 29.  Repeat Feb 28 as Feb 29 so the year 2000 has no gap"""
+        index = data.index
+        if ((index.month == 2) & (index.day == 29)).any():
+            return data
+        feb29 = data[(index.month == 2) & (index.day == 28)]
+        feb29.index = feb29.index + timedelta(days=1)
+        return pd.concat([data, feb29]).sort_index()
 
     @staticmethod
-    def local_to_utc(dt):
-        daterange_utc = []
-        for i in range(len(dt)):
-            daterange_utc.append(dt[i].astimezone(utc))
-        return daterange_utc
+    def coerce_tmy_year(tmydata):
+        """ The TMY timeseries takes months of data from different years, this wil coerce them all to 2000 so we can
+            later pick a range of dates
+        """
+        index = tmydata[0].index
+        wall = index.tz_localize(None)
+        # rebuild each date from its month and day in one pass, 2000 is a leap year so a Feb 29 row stays valid
+        months = np.datetime64('2000-01', 'M') + (wall.month.to_numpy() - 1)
+        dates = months.astype('datetime64[D]') + (wall.day.to_numpy() - 1)
+        data_ymd = pd.DatetimeIndex(dates) + (wall - wall.normalize())
+        tmydata[0].index = data_ymd.tz_localize(index.tz)
+        return tmydata
+
 
     @staticmethod
     def round_to_nearest_hour(ymdh):
-        dt_half_hour = ymdh[0].replace(minute=30, second=0, microsecond=0)
-        if ymdh[0] >= dt_half_hour:
-            ymdh = ymdh.map(lambda datetime: datetime.replace(minute=0, second=0, microsecond=0)  + timedelta(hours=1))
-        else:
-            ymdh = ymdh.map(lambda datetime: datetime.replace(minute=0, second=0, microsecond=0))
-        return ymdh
+        """ Rounds every timestamp to the nearest local hour, half past rounds up.
+
+            The rounding is done on the local wall time of each row so zones with :30 or :45 offsets land on the hour,
+            and each row keeps its own utc offset across a DST change.
+        """
+        utc_naive = ymdh.tz_convert(utc).tz_localize(None)
+        offset = ymdh.tz_localize(None) - utc_naive
+        wall = (utc_naive + offset + timedelta(minutes=30)).floor('h')
+        return (wall - offset).tz_localize(utc).tz_convert(ymdh.tz)
 
 
 
 if __name__=='__main__':
+     profiler.start_session()
      root= TMY_Clock(speed=4098)
 
-     while True:
-         root.update()
-         root.update_idletasks()
-         root.update_class()
+     scheduler = FrameScheduler(fps=60)
+     scheduler.run_tk(root, root.update_class, idle=lambda: root.pause)
+     root.mainloop()
+     print(scheduler.report())
+     print('%.2f Tk calls per frame' % root.renderer.calls_per_frame())
+     profiler.end_session()
 
     # debugging tmy stand-alone
     # root = tmy()
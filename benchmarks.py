@@ -0,0 +1,449 @@
+""" benchmarks.py
+    Stand-alone timing of the TMY clock hot paths.  No network or display is needed, the TMY data is a synthetic
+    frame shaped like the PVGIS download.
+
+    python benchmarks.py
+"""
+
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+from pytz import timezone
+
+from TMY_Clock import tmy, ClockEngine
+from city_index import city_index
+from clock_wall import WallEngine, WallRenderer
+from clock_render import ClockRenderer
+from tmy_export import samples
+from tmy_cache import tmy_cache, pvgis_backend
+from tmy_bulk import fetch_many, normalize, TmyStack, HOURS
+from time_source import FixedStepSource
+import session
+from stand_ins import synthetic_tmy, CountingCanvas, headless_clock, StandInClock, StandInWindow, standin_gui
+
+
+def timeit(fn, n):
+    """ Calls fn(i) n times and returns calls per second"""
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return n / (time.perf_counter() - start)
+
+
+def bench_ghi_lookup(speed=32768, fps=60, frames=20000):
+    """ Frames per second of the face colour lookup, the old pandas .loc slice vs tmy.ghi_at on the minute series"""
+    tz = timezone('America/New_York')
+    start = tz.localize(datetime(2000, 6, 1))
+    end = start + timedelta(weeks=3)
+    data = tmy(tz=tz, tmydata=synthetic_tmy())
+    tmy_slice = data.tmy_slice
+    step = timedelta(seconds=speed / fps)
+    times = [start + step * (i % int((end - start) / step)) for i in range(frames)]
+
+    def pandas_lookup(i):
+        displaytime = times[i]
+        hour = displaytime.replace(minute=0, second=0, microsecond=0)
+        tmy_rows = tmy_slice.loc[hour: hour + timedelta(hours=1)]
+        seek = (displaytime.timestamp() % 3600) / 3600
+        x1 = tmy_rows.index[0].timestamp()
+        x2 = tmy_rows.index[1].timestamp()
+        y1 = tmy_rows.iloc[0]['ghi']
+        y2 = tmy_rows.iloc[1]['ghi']
+        X = x1 + ((x2 - x1) * seek)
+        return y2 + (y2 - y1) * (X - x2) / (x2 - x1)
+
+    def array_lookup(i):
+        return data.ghi_at(times[i].timestamp())
+
+    data.minute_series()    # pvlib import
+    data._minutes = None
+    begin = time.perf_counter()
+    minutes = data.minute_series()
+    build = time.perf_counter() - begin
+    before = timeit(pandas_lookup, frames // 20)
+    after = timeit(array_lookup, frames)
+    print('ghi lookup @ x%d: pandas %10.0f frames/s   minute series %10.0f frames/s   (%.0fx)' % (speed, before, after, after / before))
+    print('minute series: built in %.0f ms, %.2f MB' % (build * 1e3, minutes.nbytes / 2 ** 20))
+
+
+def bench_tmy_cache(lat=39.13, lng=-77.21):
+    """ Latency of a previously seen location from the cache files and from the in-process memo, offline"""
+    with tempfile.TemporaryDirectory() as cachedir:
+        tmy_cache(cachedir=cachedir).seed(lat, lng, synthetic_tmy()[0])
+        cache = tmy_cache(cachedir=cachedir, offline=True)
+        start = time.perf_counter()
+        cache.get(lat, lng)
+        disk = time.perf_counter() - start
+        memo = 1 / timeit(lambda i: cache.get(lat, lng), 100)
+    print('tmy cache: disk %.2f ms   memo %.3f ms' % (disk * 1e3, memo * 1e3))
+
+
+def bench_tmy_index(tz='Asia/Kolkata'):
+    """ Year coercion and hour rounding of a full 8760 row TMY frame, the old Index.map path vs the vectorized one"""
+    data = synthetic_tmy()[0]
+
+    def old_path(i):
+        index = data.index.map(lambda dt: dt.replace(year=2000)).tz_convert(tz)
+        if index[0] >= index[0].replace(minute=30, second=0, microsecond=0):
+            return index.map(lambda dt: dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        return index.map(lambda dt: dt.replace(minute=0, second=0, microsecond=0))
+
+    def new_path(i):
+        index = tmy.coerce_tmy_year((data.copy(deep=False),))[0].index.tz_convert(tz)
+        return tmy.round_to_nearest_hour(index)
+
+    before = 1 / timeit(old_path, 5)
+    after = 1 / timeit(new_path, 50)
+    print('tmy index, 8760 rows: map %.2f ms   vectorized %.2f ms   (%.0fx)' % (before * 1e3, after * 1e3, before / after))
+
+
+def bench_engine(speed=32768, fps=60, frames=200000):
+    """ Headless ClockEngine, one frame at a time through advance() and in one batch through step_frames/evaluate"""
+    tz = timezone('America/New_York')
+    start = tz.localize(datetime(2000, 1, 1))
+    end = tz.localize(datetime(2000, 12, 31))
+    data = tmy(tz=tz, tmydata=synthetic_tmy())
+    engine = ClockEngine(data, start, end, speed, FixedStepSource(1 / fps))
+
+    def frame(i):
+        engine.advance()
+        engine.hand_angles()
+        engine.face_color()
+
+    single = timeit(frame, frames // 10)
+    engine.reset()
+    begin = time.perf_counter()
+    engine.evaluate(engine.step_frames(frames, 1 / fps))
+    batch = frames / (time.perf_counter() - begin)
+    print('engine @ x%d: advance %10.0f frames/s   batch %10.0f frames/s' % (speed, single, batch))
+
+    # a fixed step run is reproducible and its last frame is the endtime
+    runs = []
+    for n in range(2):
+        engine = ClockEngine(data, start, end, speed, FixedStepSource(1 / fps))
+        count = 0
+        while not engine.pause:
+            engine.advance()
+            count += 1
+        runs.append((count, engine.elapsed_ns, engine.displaytime))
+    assert runs[0] == runs[1], 'fixed step runs differ'
+    assert runs[0][2] == end, 'fixed step run ended at %s, not %s' % (runs[0][2], end)
+    print('engine @ x%d: fixed step run to the endtime in %d frames' % (speed, runs[0][0]))
+
+
+def bench_clock_wall(counts=(1, 10, 50, 200), speeds=(1, 4096), fps=60, frames=2000):
+    """ Cost per frame of a clock wall as the number of clocks grows: simulation and the dirty checked WallRenderer,
+        with the Tk calls counted on a CountingCanvas
+    """
+    start = datetime(2000, 6, 1)
+    end = datetime(2000, 6, 21)
+    zones = ['America/New_York', 'Europe/Berlin', 'Asia/Kolkata', 'Australia/Adelaide', 'America/Denver']
+    for count in counts:
+        data = []
+        for i in range(count):
+            tz = timezone(zones[i % len(zones)])
+            s, e = tz.localize(start), tz.localize(end)
+            data.append((tmy(tz=tz, tmydata=synthetic_tmy(seed=i)), s, e))
+        for speed in speeds:
+            engine = WallEngine([ClockEngine(d, s, e, speed, FixedStepSource(1 / fps)) for d, s, e in data])
+            canvas = CountingCanvas()
+            centers = [(n % 15 * 150 + 75, n // 15 * 170 + 115) for n in range(count)]
+            renderer = WallRenderer(canvas, centers, list(range(count)), [[1, 2, 3]] * count, 0, [45, 60, 60])
+
+            def frame(i):
+                engine.advance()
+                renderer.draw(engine.clock.displaytime, engine.face_colors(),
+                              engine.clock.displaytime.strftime('%B %d'))
+
+            rate = timeit(frame, frames)
+            print('clock wall x%-4d @ x%-5d %9.0f frames/s   %7.2f Tk calls per frame'
+                  % (count, speed, rate, renderer.calls_per_frame()))
+
+
+def bench_export(step=60):
+    """ Samples per second of the streaming export of a full year, all columns, no writer"""
+    tz = timezone('America/New_York')
+    start = tz.localize(datetime(2000, 6, 1))
+    engine = ClockEngine(tmy(tz=tz, tmydata=synthetic_tmy()), start, start)
+    begin = time.perf_counter()
+    count = sum(len(chunk) for chunk in samples(engine, step=step, columns=('ghi', 'dni', 'dhi', 'temp_air')))
+    seconds = time.perf_counter() - begin
+    print('export, a year every %ds: %d samples in %.2f s   %.0fx faster than real time' % (step, count, seconds, engine.span / seconds))
+
+
+def bench_iv(module='SunPower_SPR_220_BLK_U_Module___2008_', lat=39.13, lng=-77.21):
+    """ IVEngine over a full TMY year: the first, vectorized, computation and a cached one"""
+    import iv_engine
+    import pvlib.pvsystem as pvsys
+
+    module = pvsys.retrieve_sam('SandiaMod')[module]
+    data = tmy(tz=timezone('America/New_York'), tmydata=synthetic_tmy())
+    iv_engine._cache.clear()
+    begin = time.perf_counter()
+    engine = iv_engine.IVEngine(module, data, lat, lng)
+    first = time.perf_counter() - begin
+    begin = time.perf_counter()
+    iv_engine.IVEngine(module, data, lat, lng)
+    cached = time.perf_counter() - begin
+    lookup = 1 / timeit(lambda i: engine.curve_at(data.epoch[i % 8784] + 1800.0), 20000)
+    print('iv curves, %d hours: %.0f ms   cached %.3f ms   curve_at %.1f us' % (len(engine.p_mp), first * 1e3, cached * 1e3, lookup * 1e6))
+
+
+def bench_render(speeds=(1, 64, 4096, 32768), fps=60, frames=5000):
+    """ Tk calls per frame of the dirty checked ClockRenderer, the undirtied loop made 9 (3 reads, 3 writes,
+        colour, label, label update)
+    """
+    tz = timezone('America/New_York')
+    start = tz.localize(datetime(2000, 6, 1))
+    end = tz.localize(datetime(2000, 12, 31))
+    data = tmy(tz=tz, tmydata=synthetic_tmy())
+    for speed in speeds:
+        engine = ClockEngine(data, start, end, speed)
+        canvas = CountingCanvas()
+        renderer = ClockRenderer(canvas, 1, [2, 3, 4], canvas, 154, 154, [100, 125, 125])
+        epoch = engine.step_frames(frames, 1 / fps)
+        begin = time.perf_counter()
+        for t in epoch:
+            displaytime = datetime.fromtimestamp(t, tz)
+            renderer.draw(displaytime, engine.face_color(displaytime), displaytime.strftime('%B %d'))
+        rate = frames / (time.perf_counter() - begin)
+        print('render @ x%-6d %.2f Tk calls per frame   %8.0f frames/s' % (speed, renderer.calls_per_frame(), rate))
+
+
+def bench_gui_loop(targets=(30, 60, 120), seconds=1.0):
+    """ Clock frame intervals of SSTopGui.run_gui (scheduler.poll + run_due) under an idle and a busy control window,
+        with a headless clock behind a stand-in window
+    """
+    tz = timezone('America/New_York')
+    start = tz.localize(datetime(2000, 6, 1))
+    engine = ClockEngine(tmy(tz=tz, tmydata=synthetic_tmy()), start, None, 4096)
+    engine.face_color()     # the minute series, and pvlib, outside the timed frames
+
+    for fps in targets:
+        for name, window in (('idle', StandInWindow()), ('busy', StandInWindow(event_interval=0.003))):
+            engine.reset()
+            top = standin_gui(window, StandInClock(headless_clock(engine)), fps)
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                top.run_gui()
+            intervals = np.diff([f[0] for f in top.scheduler.frames]) * 1e3
+            p50, p99 = np.percentile(intervals, [50, 99])
+            print('gui loop %3d fps, %s control window: achieved %6.1f fps   interval p50 %6.2f ms   p99 %6.2f ms'
+                  % (fps, name, top.scheduler.achieved_fps(), p50, p99))
+
+
+class StandInPvgis:
+    """ Local http server answering /tmy like the PVGIS api, with the synthetic TMY year and a fixed latency per
+        request standing in for the network
+    """
+    def __init__(self, latency=0.05):
+        data = synthetic_tmy()[0]
+        hourly = pd.DataFrame({'time(UTC)': data.index.strftime('%Y%m%d:%H%M'), 'T2m': data['temp_air'],
+                               'RH': 50.0, 'G(h)': data['ghi'], 'Gb(n)': data['dni'], 'Gd(h)': data['dhi'],
+                               'IR(h)': 300.0, 'WS10m': 2.0, 'WD10m': 180.0, 'SP': 101325.0})
+        body = json.dumps({'inputs': {}, 'meta': {'inputs': {}},
+                           'outputs': {'months_selected': [], 'tmy_hourly': hourly.to_dict('records')}}).encode()
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/' % self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def bench_bulk(sites=64, workers=(1, 4, 16), latency=0.05, stacked=2000):
+    """ Sites per second of fetch_many from a stand-in PVGIS server through an empty cache, then from the cache files,
+        and the daily insolation of a large stack
+    """
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-50, 60, sites)
+    lngs = rng.uniform(-180, 180, sites)
+    server = StandInPvgis(latency)
+    try:
+        for processes in (False, True):
+            for count in workers:
+                with tempfile.TemporaryDirectory() as cachedir:
+                    cache = tmy_cache(cachedir=cachedir, maxbytes=2 ** 30, memo_size=1,
+                                      backend=partial(pvgis_backend, url=server.url))
+                    begin = time.perf_counter()
+                    stack = fetch_many(lats, lngs, cache=cache, workers=count, processes=processes)
+                    cold = time.perf_counter() - begin
+                    begin = time.perf_counter()
+                    fetch_many(lats, lngs, cache=cache, workers=count)
+                    warm = time.perf_counter() - begin
+                print('bulk fetch, %d sites, %2d %s, %d ms latency: %6.1f sites/s   cached %7.1f sites/s   %d errors'
+                      % (sites, count, 'processes' if processes else 'threads  ', latency * 1e3, sites / cold,
+                         sites / warm, len(stack.errors)))
+    finally:
+        server.close()
+
+    row = normalize(synthetic_tmy()[0])
+    stack = TmyStack(np.zeros(stacked), np.linspace(-180, 180, stacked), range(stacked),
+                     {c: np.repeat(row[c][None, :], stacked, axis=0) for c in row}, {})
+    begin = time.perf_counter()
+    stack.daily_insolation()
+    print('daily insolation, %d sites x %d hours: %.0f ms' % (stacked, HOURS, (time.perf_counter() - begin) * 1e3))
+
+
+def bench_relaunch(lat=39.13, lng=-77.21, runs=10):
+    """ Play after Stop: a cold launch (tmy data from the cache files, timezone, minute series, hand tables, first
+        frame) against TMY_Clock.restart of the retained clock (a new engine over the same tmy data, first frame)
+        behind a counting canvas, and resuming a saved session
+    """
+    import timezones
+    start = datetime(2000, 6, 1)
+    end = datetime(2000, 6, 8)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmy_cache(cachedir=tmp).seed(lat, lng, synthetic_tmy()[0])
+
+        def launch():
+            timezones._tz_name.cache_clear()
+            engine = ClockEngine.for_location(lat, lng, start, end, cache=tmy_cache(cachedir=tmp, offline=True))
+            engine.tmy.minute_series()
+            clock = headless_clock(engine)
+            clock.update_class()
+            return clock
+
+        launch()    # imports
+        cold = []
+        for i in range(runs):
+            begin = time.perf_counter()
+            clock = launch()
+            cold.append(time.perf_counter() - begin)
+
+        warm = []
+        for i in range(runs * 100):
+            clock.stop()
+            begin = time.perf_counter()
+            clock.restart(start, end)
+            warm.append(time.perf_counter() - begin)
+
+        path = tmp + '/session.json'
+        clock.seek(3600 * 10 ** 9)
+        begin = time.perf_counter()
+        session.save({'run': {'locations': [[lat, lng]]}, 'elapsed_ns': clock.position}, path)
+        clock.restart(start, end)
+        clock.seek(session.load(path)['elapsed_ns'])
+        resume = time.perf_counter() - begin
+    print('relaunch: cold %.1f ms   warm restart %.3f ms   (%.0fx)   save + resume %.3f ms, %s'
+          % (np.median(cold) * 1e3, np.median(warm) * 1e3, np.median(cold) / np.median(warm), resume * 1e3,
+             clock.displaytime.strftime('%B %d %H:%M')))
+
+
+def synthetic_worldcities(path, rows=44000, seed=0):
+    """ Writes a csv with the worldcities.csv columns the CityPicker reads"""
+    rng = np.random.default_rng(seed)
+    country = rng.integers(0, 240, rows)
+    pd.DataFrame({
+        'city': ['City %d' % i for i in range(rows)],
+        'city_ascii': ['City %d' % i for i in range(rows)],
+        'lat': rng.uniform(-60, 70, rows),
+        'lng': rng.uniform(-180, 180, rows),
+        'country': ['Country %d' % c for c in country],
+        'admin_name': np.where(rng.random(rows) < 0.02, None, ['Admin %d' % (i % 50) for i in range(rows)]),
+    }).to_csv(path, index=False)
+
+
+def bench_city_index():
+    """ CityPicker startup: parsing and sorting the csv with pandas vs memory-mapping the prebuilt city_index"""
+    with tempfile.TemporaryDirectory() as tmp:
+        csvpath = tmp + '/worldcities.csv'
+        synthetic_worldcities(csvpath)
+
+        begin = time.perf_counter()
+        worldcities = pd.read_csv(csvpath, usecols=['country', 'city_ascii', 'admin_name', 'lat', 'lng'])
+        worldcities = worldcities.sort_values(by=['country', 'city_ascii'])
+        worldcities['country'].drop_duplicates()
+        csv = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        city_index(csvpath)
+        build = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        index = city_index(csvpath)
+        index.countries()
+        load = time.perf_counter() - begin
+
+        countries = index.countries()
+        select = 1 / timeit(lambda i: index.location(countries[i % 240], index.cities_in(countries[i % 240])[0]), 10000)
+    print('city index: pandas csv %.1f ms   first build %.1f ms   mmap load %.2f ms   selection %.1f us' % (csv * 1e3, build * 1e3, load * 1e3, select * 1e6))
+
+
+# seconds, ss_gui must open its window without pandas, pvlib or timezonefinder, the clocks pay for them on launch
+STARTUP_BUDGET = {'ss_gui': 0.5, 'TMY_Clock': 1.5, 'tmy_cache': 1.5, 'timezones': 0.4, 'city_index': 0.4}
+
+
+def bench_startup(modules=('ss_gui', 'TMY_Clock', 'tmy_cache', 'timezones', 'city_index'), budget=STARTUP_BUDGET):
+    """ Import time of each module in a fresh interpreter from python -X importtime, with its heaviest imports.
+
+    :param budget: {module: seconds}, a module importing slower than its budget is reported as OVER BUDGET
+    :return: ({module: seconds}, list of the modules over budget), seconds is None for a module that failed to import
+    """
+    times = {}
+    slow = []
+    for module in modules:
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], capture_output=True, text=True)
+        if result.returncode:
+            times[module] = None
+            print('import %-12s failed: %s' % (module, result.stderr.strip().splitlines()[-1]))
+            continue
+        # lines look like 'import time: self [us] | cumulative | imported package', nesting shown by 2 space indents
+        rows = []
+        for line in result.stderr.splitlines()[1:]:
+            self_us, cumulative, name = line.split(':', 1)[1].split('|')
+            name = name[1:].rstrip()
+            rows.append((int(cumulative), len(name) - len(name.lstrip()), name.strip()))
+        times[module] = rows[-1][0] / 1e6
+        # direct imports of the module are the level 1 rows after the previous top level import
+        first = max([i for i, r in enumerate(rows[:-1]) if r[1] == 0], default=-1) + 1
+        heaviest = sorted((r[0], r[2]) for r in rows[first:-1] if r[1] == 2)[::-1][:3]
+        over = module in budget and times[module] > budget[module]
+        if over:
+            slow.append(module)
+        print('import %-12s %7.1f ms   %s%s' % (module, times[module] * 1e3, ', '.join('%s %.0f ms' % (n, c / 1e3) for c, n in heaviest),
+                                              '   OVER BUDGET of %.0f ms' % (budget[module] * 1e3) if over else ''))
+    return times, slow
+
+
+if __name__ == '__main__':
+    bench_ghi_lookup()
+    bench_tmy_cache()
+    bench_tmy_index()
+    bench_engine()
+    bench_clock_wall()
+    bench_render()
+    bench_export()
+    bench_iv()
+    bench_gui_loop()
+    bench_bulk()
+    bench_relaunch()
+    bench_city_index()
+    if bench_startup()[1]:
+        sys.exit(1)
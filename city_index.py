@@ -0,0 +1,106 @@
+""" city_index.py
+    Prebuilt index of worldcities.csv for the CityPicker.  The first load parses the csv once and writes two numpy
+    files next to it, rebuilt whenever the csv is newer:
+
+        worldcities.cities.npy      rows sorted by country and city: country, 'city - admin' label, lat, lng
+        worldcities.countries.npy   country name and the [start, stop) row range of its cities
+
+    Later loads memory-map these files so the gui never parses the csv, and a selection is a dict lookup.
+"""
+
+import os
+
+import numpy as np
+
+
+class city_index:
+    """
+    Countries, their city labels ('city_ascii - admin_name') and the lat/lng of each city.
+    """
+
+    def __init__(self, csvpath='worldcities.csv'):
+        """
+        :param csvpath: path of the simplemaps worldcities.csv
+        """
+        base = os.path.splitext(csvpath)[0]
+        self.csvpath = csvpath
+        self.citypath = base + '.cities.npy'
+        self.countrypath = base + '.countries.npy'
+        if self.stale():
+            cities, countries = self.build(csvpath)
+            try:
+                np.save(self.citypath, cities)
+                np.save(self.countrypath, countries)
+            except OSError:
+                # read only data directory, keep the index in memory for this session
+                self.cities, countries = cities, countries
+            else:
+                self.cities = np.load(self.citypath, mmap_mode='r')
+        else:
+            self.cities = np.load(self.citypath, mmap_mode='r')
+            countries = np.load(self.countrypath)
+        self.ranges = {c['name'].decode(): (int(c['start']), int(c['stop'])) for c in countries}
+        self.labels = {}    # country -> {label: row}, filled as countries are picked
+
+    def stale(self):
+        """ True if the index files are missing or older than the csv"""
+        try:
+            built = min(os.path.getmtime(self.citypath), os.path.getmtime(self.countrypath))
+        except OSError:
+            return True
+        return os.path.exists(self.csvpath) and os.path.getmtime(self.csvpath) > built
+
+    @staticmethod
+    def build(csvpath):
+        """ Parses the csv into the sorted city table and the country ranges"""
+        import pandas as pd
+
+        worldcities = pd.read_csv(csvpath, usecols=['country', 'city_ascii', 'admin_name', 'lat', 'lng'])
+        worldcities = worldcities.sort_values(by=['country', 'city_ascii'], kind='stable')
+        # some data entries have no admin_name
+        country = worldcities['country'].str.encode('utf-8').to_numpy()
+        label = (worldcities['city_ascii'] + ' - ' + worldcities['admin_name'].fillna('')).str.encode('utf-8').to_numpy()
+        cities = np.empty(len(worldcities), dtype=[('country', 'S%d' % max(map(len, country))),
+                                                   ('label', 'S%d' % max(map(len, label))),
+                                                   ('lat', 'f8'), ('lng', 'f8')])
+        cities['country'] = country
+        cities['label'] = label
+        cities['lat'] = worldcities['lat'].to_numpy()
+        cities['lng'] = worldcities['lng'].to_numpy()
+
+        starts = np.flatnonzero(np.r_[True, cities['country'][1:] != cities['country'][:-1]])
+        countries = np.empty(len(starts), dtype=[('name', cities.dtype['country']), ('start', 'i8'), ('stop', 'i8')])
+        countries['name'] = cities['country'][starts]
+        countries['start'] = starts
+        countries['stop'] = np.r_[starts[1:], len(cities)]
+        return cities, countries
+
+    def countries(self):
+        """ Sorted list of country names"""
+        return list(self.ranges)
+
+    def city_rows(self, country):
+        """ {label: row} of the cities of a country"""
+        rows = self.labels.get(country)
+        if rows is None:
+            start, stop = self.ranges[country]
+            rows = {}
+            for row, label in enumerate(self.cities['label'][start:stop], start):
+                rows.setdefault(label.decode(), row)
+            self.labels[country] = rows
+        return rows
+
+    def cities_in(self, country):
+        """ Sorted list of the 'city - admin' labels of a country"""
+        return list(self.city_rows(country))
+
+    def sites(self, country=None):
+        """ Labels, lats and lngs of the cities of a country, or of every city, as arrays"""
+        rows = self.cities if country is None else self.cities[slice(*self.ranges[country])]
+        labels = np.char.decode(rows['label'], 'utf-8')
+        return labels, rows['lat'].astype(np.float64), rows['lng'].astype(np.float64)
+
+    def location(self, country, label):
+        """ (lat, lng) of a city"""
+        row = self.cities[self.city_rows(country)[label]]
+        return float(row['lat']), float(row['lng'])
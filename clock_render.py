@@ -0,0 +1,95 @@
+"""clock_render
+Draws a clock frame on a Tk canvas with as few Tk calls as possible.
+
+The hand end points are looked up in tables built once (720 hour hand positions, one per minute of 12 hours, 3600
+minute hand positions, one per second of the hour, and 60 second hand positions) and rounded to whole pixels.
+The last drawn end points, face grey level and date text are kept, and a Tk call is only made for what changed.
+"""
+
+import math
+
+
+class HandTables:
+    """ Pixel end points of the hands for every position they can take"""
+    def __init__(self, x, y, lengths):
+        """
+        :param x:       Center point x
+        :param y:       Center point y
+        :param lengths: hour, minute and optionally second hand lengths
+        """
+        steps = [(720, 0.5), (3600, 0.1), (60, 6.0)]    # positions and degrees per position
+        self.tables = []
+        for length, (count, degrees) in zip(lengths, steps):
+            table = []
+            for i in range(count):
+                angle = math.radians(i * degrees)
+                table.append((round(x + length * math.sin(angle)), round(y - length * math.cos(angle))))
+            self.tables.append(table)
+
+    @staticmethod
+    def positions(displaytime):
+        """ Table indexes of the hour, minute and second hands"""
+        minute, second = displaytime.minute, displaytime.second
+        return (displaytime.hour % 12) * 60 + minute, minute * 60 + second, second
+
+    def ends(self, displaytime):
+        return [table[i] for table, i in zip(self.tables, self.positions(displaytime))]
+
+
+class ClockRenderer:
+    """
+    Dirty checked drawing of one clock face.  calls is the number of Tk calls made by the last frame.
+    """
+    def __init__(self, canvas, face, sticks, datelabel, x, y, lengths):
+        """
+        :param canvas:    Tk canvas holding the face and the hands
+        :param face:      canvas id of the clock face oval
+        :param sticks:    canvas ids of the hour, minute and optionally second hands
+        :param datelabel: Tk Label showing the date
+        """
+        self.canvas = canvas
+        self.face = face
+        self.sticks = sticks
+        self.datelabel = datelabel
+        self.x = x
+        self.y = y
+        self.hands = HandTables(x, y, lengths)
+        self.ends = [None] * len(sticks)
+        self.color = None
+        self.text = None
+        self.calls = 0
+        self.total_calls = 0
+        self.frames = 0
+
+    def draw(self, displaytime, color, text):
+        """
+        :param displaytime: datetime the hands show
+        :param color:       face grey level 0-255
+        :param text:        date label text
+        """
+        calls = 0
+        for n, end in enumerate(self.hands.ends(displaytime)):
+            if end != self.ends[n]:
+                self.canvas.coords(self.sticks[n], self.x, self.y, end[0], end[1])
+                self.ends[n] = end
+                calls += 1
+        if color != self.color:
+            self.canvas.itemconfig(self.face, fill='#%02x%02x%02x' % (color, color, color))
+            self.color = color
+            calls += 1
+        if text != self.text:
+            self.datelabel.config(text=text)
+            self.text = text
+            calls += 1
+        self.calls = calls
+        self.total_calls += calls
+        self.frames += 1
+
+    def invalidate(self):
+        """ Forget what was drawn so the next frame redraws everything"""
+        self.ends = [None] * len(self.sticks)
+        self.color = None
+        self.text = None
+
+    def calls_per_frame(self):
+        return self.total_calls / self.frames if self.frames else 0.0
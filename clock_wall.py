@@ -0,0 +1,235 @@
+"""clock_wall
+Many TMY clocks, one per location, on a single canvas.
+
+All the clocks start at the same local start time and share one simulated elapsed time, so they show the same local
+time of day and the faces compare the irradiance of the sites.  The ghi of every location is resampled once onto a
+common hourly grid (locations x hours of the cyclic TMY year) so all the face colours of a frame come from one
+vectorized interpolation.  WallRenderer looks the shared hand positions up in the clock_render tables once per frame
+and only sends Tk what changed.
+"""
+try:
+	import Tkinter
+except:
+	import tkinter as Tkinter
+
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from TMY_Clock import ClockEngine
+from clock_render import HandTables
+from clock_window import ClockWindow
+from instrumentation import profiler
+
+
+class WallEngine:
+    """
+    The shared simulation of a clock wall.  The first ClockEngine drives the time, the others supply their tmy data.
+    """
+    def __init__(self, engines, names=None):
+        """
+        :param engines: list of ClockEngine, one per location, with the same local start and end times
+        :param names:   list of location names to label the clocks with
+        """
+        self.engines = engines
+        self.clock = engines[0]
+        self.names = names if names is not None else [''] * len(engines)
+
+        # ghi of each location at its own start time + k hours over one cyclic year, float32 locations x hours
+        self.hours = int(self.clock.tmy.period // 3600)
+        starts = np.array([e.starttime.timestamp() for e in engines])
+        grid = starts[:, None] + 3600.0 * np.arange(self.hours)
+        # straight from the hourly rows, the minute series of every location would cost 2 MB each
+        self.ghi = np.stack([e.tmy.values_many('ghi', grid[i]) for i, e in enumerate(engines)]).astype(np.float32)
+
+    @classmethod
+    def for_locations(cls, locations, starttime, endtime, speed=1, names=None, source=None):
+        """
+        :param locations: list of (lat, lng)
+        :param starttime: naive datetime, the local start time at every location
+        :param endtime:   naive datetime
+        :param source:    time source of the driving engine
+        """
+        engines = [ClockEngine.for_location(lat, lng, starttime, endtime, speed, source if i == 0 else None)
+                   for i, (lat, lng) in enumerate(locations)]
+        return cls(engines, names)
+
+    def restarted(self, starttime, endtime, speed=None):
+        """ A new wall engine for another run over the same tmy data, see ClockEngine.restarted"""
+        return WallEngine([e.restarted(starttime, endtime, speed) for e in self.engines], self.names)
+
+    @property
+    def speed(self):
+        return self.clock.speed
+
+    @speed.setter
+    def speed(self, speed):
+        self.clock.speed = speed
+
+    @property
+    def pause(self):
+        return self.clock.pause
+
+    @pause.setter
+    def pause(self, pause):
+        self.clock.pause = pause
+
+    @property
+    def displaytime(self):
+        return self.clock.displaytime
+
+    @property
+    def elapsed_ns(self):
+        return self.clock.elapsed_ns
+
+    @property
+    def starttime(self):
+        return self.clock.starttime
+
+    @property
+    def endtime(self):
+        return self.clock.endtime
+
+    def advance(self, now=None):
+        return self.clock.advance(now)
+
+    def reset(self):
+        self.clock.reset()
+
+    def seek(self, elapsed_ns):
+        return self.clock.seek(elapsed_ns)
+
+    def face_colors(self, elapsed=None):
+        """ Grey levels of all the faces.
+
+        :param elapsed: simulated seconds since the start, scalar or array of frames.  Defaults to the current time
+        :return: uint8 array, locations or locations x frames
+        """
+        if elapsed is None:
+            elapsed = self.clock.elapsed_seconds
+        hour = np.asarray(elapsed, dtype=np.float64) / 3600
+        whole = np.floor(hour)
+        frac = (hour - whole).astype(np.float32)
+        k = whole.astype(np.intp) % self.hours
+        ghi = self.ghi[:, k] * (1 - frac) + self.ghi[:, (k + 1) % self.hours] * frac
+        return np.clip(np.rint(ghi / 1000 * 256), 0, 255).astype(np.uint8)
+
+
+class WallRenderer:
+    """
+    Dirty checked drawing of a clock wall.  calls is the number of Tk calls made by the last frame.
+    """
+    def __init__(self, canvas, centers, faces, sticks, datelabel, lengths):
+        """
+        :param canvas:    Tk canvas holding the clocks
+        :param centers:   (x, y) center of each clock
+        :param faces:     canvas id of each clock face oval
+        :param sticks:    canvas ids of the hands of each clock
+        :param datelabel: canvas id of the date text
+        :param lengths:   hour, minute and optionally second hand lengths
+        """
+        self.canvas = canvas
+        self.centers = centers
+        self.faces = faces
+        self.sticks = sticks
+        self.datelabel = datelabel
+        self.hands = HandTables(0, 0, lengths)     # offsets from a clock center
+        self.calls = 0
+        self.total_calls = 0
+        self.frames = 0
+        self.invalidate()
+
+    def draw(self, displaytime, colors, text):
+        """
+        :param displaytime: datetime every clock shows
+        :param colors:      uint8 array of the face grey levels
+        :param text:        date label text
+        """
+        calls = 0
+        # every clock shows the same local time, a hand moves on all of them or on none
+        for n, end in enumerate(self.hands.ends(displaytime)):
+            if end != self.ends[n]:
+                dx, dy = end
+                for (x, y), sticks in zip(self.centers, self.sticks):
+                    self.canvas.coords(sticks[n], x, y, x + dx, y + dy)
+                self.ends[n] = end
+                calls += len(self.sticks)
+
+        # only faces whose grey level changed are reconfigured
+        for n in np.flatnonzero(colors != self.colors):
+            self.canvas.itemconfig(self.faces[n], fill='#%02x%02x%02x' % (colors[n], colors[n], colors[n]))
+            calls += 1
+        self.colors = colors
+
+        if text != self.text:
+            self.canvas.itemconfig(self.datelabel, text=text)
+            self.text = text
+            calls += 1
+        self.calls = calls
+        self.total_calls += calls
+        self.frames += 1
+
+    def invalidate(self):
+        """ Forget what was drawn so the next frame redraws everything"""
+        self.ends = [None] * len(self.hands.tables)
+        self.colors = np.full(len(self.faces), -1)
+        self.text = None
+
+    def calls_per_frame(self):
+        return self.total_calls / self.frames if self.frames else 0.0
+
+
+class ClockWall(ClockWindow, Tkinter.Tk):
+    """ Tk window drawing a WallEngine as a grid of small clock faces"""
+    def __init__(self, locations, names=None, speed=1, starttime=None, endtime=None, size=150, nosecond=False, source=None):
+        """
+        :param locations: list of (lat, lng)
+        :param names:     list of names shown under each clock
+        :param speed:     Time multiplier
+        :param starttime: Datetime to start the clocks, defaults to now
+        :param endtime:   Datetime to pause the clocks at the end of the run, defaults to two weeks after the starttime
+        :param size:      Pixel size of each clock
+        :param nosecond:  Bool to remove the second hands
+        :param source:    Time source of the engine, defaults to the real time
+        """
+        if starttime is None:
+            starttime = datetime.now()
+        if endtime is None:
+            endtime = starttime + timedelta(weeks=2)
+        self.engine = WallEngine.for_locations(locations, starttime, endtime, speed, names, source)
+        Tkinter.Tk.__init__(self)
+        self.size = size
+        self.columns = int(math.ceil(math.sqrt(len(locations))))
+        rows = int(math.ceil(len(locations) / self.columns))
+        self.length = [size * 0.3, size * 0.4, size * 0.4][:2 if nosecond else 3]
+        self.width = [3, 2, 1]
+        self.title('TMY Clock Wall')
+
+        self.canvas = Tkinter.Canvas(self, bg='blue', width=self.columns * size, height=rows * (size + 20) + 40)
+        self.canvas.pack(expand='no', fill='both')
+        self.datelabel = self.canvas.create_text(self.columns * size / 2, 20, text=self.starttime.strftime('%B %d'), font=('Times', '18', 'bold'), fill='white')
+        self.centers = []
+        self.faces = []
+        self.sticks = []
+        for n, name in enumerate(self.engine.names):
+            x = (n % self.columns) * size + size / 2
+            y = (n // self.columns) * (size + 20) + 40 + size / 2
+            self.centers.append((x, y))
+            self.faces.append(self.canvas.create_oval(x - size / 2 + 5, y - size / 2 + 5, x + size / 2 - 5, y + size / 2 - 5, fill='gray50', outline='red', width=2))
+            self.sticks.append([self.canvas.create_line(x, y, x, y, width=self.width[i], fill='red') for i in range(len(self.length))])
+            self.canvas.create_text(x, y + size / 2 + 8, text=name, fill='white')
+        self.renderer = WallRenderer(self.canvas, self.centers, self.faces, self.sticks, self.datelabel, self.length)
+
+    def update_class(self):
+        with profiler.phase('advance'):
+            self.engine.advance()
+        with profiler.phase('colour'):
+            colors = self.engine.face_colors()
+
+        txt = self.displaytime.strftime('%B %d')
+        if self.pause:
+            txt += ' (paused)'
+        with profiler.phase('redraw'):
+            self.renderer.draw(self.displaytime, colors, txt)
+        profiler.count('tk calls', self.renderer.calls)
@@ -0,0 +1,81 @@
+"""clock_window
+The run controls shared by the Tk clock windows, TMY_Clock and ClockWall.
+
+The window owns an engine (ClockEngine or WallEngine) and a dirty checked renderer (ClockRenderer or WallRenderer)
+and draws a frame in update_class().  Everything the gui does to a running clock goes through this mixin.
+"""
+try:
+	import Tkinter
+except:
+	import tkinter as Tkinter
+
+
+class ClockWindow:
+    """
+    Mixin of a Tkinter.Tk window with self.engine, self.renderer and an update_class() drawing one frame.
+    """
+
+    # the gui sets these on a running clock
+    @property
+    def speed(self):
+        return self.engine.speed
+
+    @speed.setter
+    def speed(self, speed):
+        self.engine.speed = speed
+
+    @property
+    def pause(self):
+        return self.engine.pause
+
+    @pause.setter
+    def pause(self, pause):
+        self.engine.pause = pause
+
+    @property
+    def displaytime(self):
+        return self.engine.displaytime
+
+    @property
+    def starttime(self):
+        return self.engine.starttime
+
+    @property
+    def endtime(self):
+        return self.engine.endtime
+
+    @property
+    def position(self):
+        """ Simulated nanoseconds since the start of the run"""
+        return self.engine.elapsed_ns
+
+    def alive(self):
+        """ False once the window has been closed"""
+        try:
+            return bool(self.winfo_exists())
+        except Tkinter.TclError:
+            return False
+
+    def stop(self):
+        """ Back to the start of the run and paused, the window stays up for the next Play"""
+        self.engine.reset()
+        self.pause = True
+        self.update_class()
+
+    def restart(self, starttime, endtime, speed=None):
+        """ A new run in this window, paused at its start.  The tmy data, timezone, minute series, IV curves and hand
+            tables are all kept, only the engine is replaced and the renderer redraws everything.
+
+        :param starttime: naive datetime to start the clock
+        :param endtime:   naive datetime to pause the clock at
+        :param speed:     Time multiplier, defaults to the current one
+        """
+        self.engine = self.engine.restarted(starttime, endtime, speed)
+        self.pause = True
+        self.renderer.invalidate()
+        self.update_class()
+
+    def seek(self, position):
+        """ Jumps to position simulated nanoseconds after the start, e.g. to resume a saved session"""
+        self.engine.seek(position)
+        self.update_class()
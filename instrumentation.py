@@ -0,0 +1,157 @@
+""" instrumentation.py
+    Per phase frame timings of the gui loop and the clock frames, and per frame counts such as the Tk calls.
+
+    The shared profiler is off by default and costs one attribute check per phase when off.  It can be switched on a
+    running app from the Profile checkbox of the gui, with SIGUSR1 (posix), or at start with TMY_PROFILE=1.
+    TMY_CPROFILE=<file> also runs cProfile over the whole session and dumps the stats to the file on exit.
+
+        with profiler.phase('redraw'):
+            ...
+        profiler.count('tk calls', calls)
+        profiler.frame_done()
+        print(profiler.report())
+"""
+
+import cProfile
+import os
+import signal
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+_off = nullcontext()
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+
+class FrameProfiler:
+    """
+    Rolling window of the durations of named phases, of named per frame counts, and of frame times for the FPS.
+    """
+
+    def __init__(self, window=600, enabled=False):
+        """
+        :param window:  Number of recent samples kept per phase
+        :param enabled: Bool, start recording immediately
+        """
+        self.window = window
+        self.enabled = enabled
+        self.phases = {}    # name -> deque of seconds, in first use order
+        self.counters = {}  # name -> deque of counts per frame
+        self.frames = deque(maxlen=window)
+        self.cprofile = None
+
+    def phase(self, name):
+        """ Context manager timing a phase, does nothing while disabled"""
+        if not self.enabled:
+            return _off
+        return _Phase(self, name)
+
+    def record(self, name, seconds):
+        samples = self.phases.get(name)
+        if samples is None:
+            samples = self.phases[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def count(self, name, n):
+        """ Records a per frame count, does nothing while disabled"""
+        if not self.enabled:
+            return
+        samples = self.counters.get(name)
+        if samples is None:
+            samples = self.counters[name] = deque(maxlen=self.window)
+        samples.append(n)
+
+    def frame_done(self):
+        if self.enabled:
+            self.frames.append(time.perf_counter())
+
+    def toggle(self, enabled=None):
+        """ Switches recording, clearing the old samples when it is switched on"""
+        if enabled is None:
+            enabled = not self.enabled
+        if enabled and not self.enabled:
+            self.phases.clear()
+            self.counters.clear()
+            self.frames.clear()
+        self.enabled = enabled
+
+    def fps(self):
+        if len(self.frames) < 2:
+            return 0.0
+        span = self.frames[-1] - self.frames[0]
+        return (len(self.frames) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        """ {phase: (p50, p99, mean)} in seconds"""
+        out = {}
+        for name, samples in self.phases.items():
+            if samples:
+                values = np.fromiter(samples, dtype=np.float64)
+                p50, p99 = np.percentile(values, [50, 99])
+                out[name] = (p50, p99, values.mean())
+        return out
+
+    def counts(self):
+        """ {counter: (mean, max)} per frame"""
+        return {name: (sum(samples) / len(samples), max(samples)) for name, samples in self.counters.items() if samples}
+
+    def report(self):
+        lines = ['%.1f fps over the last %d frames' % (self.fps(), len(self.frames))]
+        for name, (p50, p99, mean) in self.stats().items():
+            lines.append('  %-14s p50 %8.3f ms   p99 %8.3f ms   mean %8.3f ms' % (name, p50 * 1e3, p99 * 1e3, mean * 1e3))
+        for name, (mean, most) in self.counts().items():
+            lines.append('  %-14s mean %6.2f per frame   max %d' % (name, mean, most))
+        return '\n'.join(lines)
+
+    def start_cprofile(self):
+        self.cprofile = cProfile.Profile()
+        self.cprofile.enable()
+
+    def stop_cprofile(self, path):
+        """ Stops cProfile and dumps the stats to path, read them with pstats"""
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(path)
+            self.cprofile = None
+
+    def install_signal_toggle(self):
+        """ SIGUSR1 toggles recording and prints the report when it is switched off"""
+        if hasattr(signal, 'SIGUSR1'):
+            def handler(signum, frame):
+                if self.enabled:
+                    print(self.report())
+                self.toggle()
+            signal.signal(signal.SIGUSR1, handler)
+
+    def start_session(self):
+        """ Applies TMY_PROFILE and TMY_CPROFILE, and the SIGUSR1 toggle.  Call once at program start"""
+        self.toggle(os.environ.get('TMY_PROFILE', '0') not in ('', '0'))
+        if os.environ.get('TMY_CPROFILE'):
+            self.start_cprofile()
+        self.install_signal_toggle()
+
+    def end_session(self):
+        """ Prints the report if recording, dumps the cProfile capture.  Call once at program exit"""
+        if self.enabled:
+            print(self.report())
+        if self.cprofile is not None:
+            self.stop_cprofile(os.environ['TMY_CPROFILE'])
+
+
+# shared by the gui loop and the clocks
+profiler = FrameProfiler()
@@ -0,0 +1,97 @@
+""" iv_engine.py
+    Operating points and IV curves of a Sandia (SAPM) module at every hour of the TMY year.
+
+    The whole year is computed in one vectorized pass of pvlib: solar position, plane of array irradiance on a fixed
+    tilt, SAPM effective irradiance and cell temperature, then pvsystem.sapm().  Each hour keeps the five SAPM curve
+    points (Isc, Ix at Voc/2, Imp at Vmp, Ixx at (Voc+Vmp)/2, Voc) as float32, and the clock reads the current hour's
+    curve by index.  Results are cached per module, location and orientation.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import pvlib
+from pvlib.location import Location
+from pvlib.temperature import TEMPERATURE_MODEL_PARAMETERS
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_SIZE = 8
+
+
+class IVEngine:
+    """
+    SAPM IV curves of one module over the cyclic TMY year of a tmy object.
+    """
+
+    def __init__(self, module, tmydata, lat, lng, surface_tilt=None, surface_azimuth=180, albedo=0.25,
+                 temperature_model='open_rack_glass_glass'):
+        """
+        :param module:            row of pvsystem.retrieve_sam('SandiaMod'), a pandas Series named after the module
+        :param tmydata:           tmy object of the location
+        :param lat:               latitude
+        :param lng:               longitude
+        :param surface_tilt:      degrees, defaults to the latitude
+        :param surface_azimuth:   degrees east of north
+        :param albedo:            ground reflectance
+        :param temperature_model: key of pvlib's sapm TEMPERATURE_MODEL_PARAMETERS
+        """
+        if surface_tilt is None:
+            surface_tilt = abs(lat)
+        self.module = module
+        self.tmy = tmydata
+        key = (module.name, round(lat, 2), round(lng, 2), surface_tilt, surface_azimuth, albedo, temperature_model)
+        with _cache_lock:
+            arrays = _cache.get(key)
+            if arrays is not None:
+                _cache.move_to_end(key)
+        if arrays is None:
+            arrays = self.compute(module, tmydata, lat, lng, surface_tilt, surface_azimuth, albedo, temperature_model)
+            with _cache_lock:
+                _cache[key] = arrays
+                while len(_cache) > CACHE_SIZE:
+                    _cache.popitem(last=False)
+        self.v, self.i, self.p_mp = arrays
+
+    @staticmethod
+    def compute(module, tmydata, lat, lng, surface_tilt, surface_azimuth, albedo, temperature_model):
+        """ One pass over the year.
+
+        :return: v and i, float32 arrays hours x 5 of the curve points, and p_mp, float32 array of the max power
+        """
+        data = tmydata.tmy_slice
+        times = data.index
+        location = Location(lat, lng, tz=tmydata.tz)
+        solpos = location.get_solarposition(times)
+        airmass = location.get_airmass(times, solar_position=solpos)
+        poa = pvlib.irradiance.get_total_irradiance(surface_tilt, surface_azimuth, solpos['apparent_zenith'],
+                                                    solpos['azimuth'], data['dni'], data['ghi'], data['dhi'],
+                                                    albedo=albedo)
+        aoi = pvlib.irradiance.aoi(surface_tilt, surface_azimuth, solpos['apparent_zenith'], solpos['azimuth'])
+        effective = pvlib.pvsystem.sapm_effective_irradiance(poa['poa_direct'], poa['poa_diffuse'],
+                                                            airmass['airmass_absolute'], aoi, module)
+        wind = data['wind_speed'] if 'wind_speed' in data else 1.0
+        temp_cell = pvlib.temperature.sapm_cell(poa['poa_global'], data['temp_air'], wind,
+                                                **TEMPERATURE_MODEL_PARAMETERS['sapm'][temperature_model])
+        out = pvlib.pvsystem.sapm(effective.clip(lower=0), temp_cell, module)
+
+        def col(name):
+            return np.nan_to_num(np.asarray(out[name], dtype=np.float64)).clip(min=0)
+
+        v_oc, v_mp = col('v_oc'), col('v_mp')
+        zero = np.zeros(len(times))
+        v = np.stack([zero, v_oc / 2, v_mp, (v_oc + v_mp) / 2, v_oc], axis=1)
+        i = np.stack([col('i_sc'), col('i_x'), col('i_mp'), col('i_xx'), zero], axis=1)
+        return v.astype(np.float32), i.astype(np.float32), col('p_mp').astype(np.float32)
+
+    def curve_at(self, timestamp):
+        """ (v, i) arrays of the 5 SAPM curve points of the hour holding a POSIX timestamp"""
+        row = self.tmy.row_at(timestamp)
+        return self.v[row], self.i[row]
+
+    def operating_point(self, timestamp):
+        """ (v_mp, i_mp, p_mp) of the hour holding a POSIX timestamp"""
+        row = self.tmy.row_at(timestamp)
+        return float(self.v[row, 2]), float(self.i[row, 2]), float(self.p_mp[row])
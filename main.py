@@ -3,7 +3,9 @@
     closes when ss_gui is closed
 """
 from ss_gui import SSTopGui
+from instrumentation import profiler
 
+profiler.start_session()
 sstop = SSTopGui()
 sstop.start_gui()
 
@@ -13,5 +15,10 @@ while 1:
         break
 
     # This is the "outer loop"
-    # if the TMY Clock is running, update it
+    # run_gui waits for gui events until the next TMY Clock frame is due, then updates the clock
     sstop.run_gui()
+
+print(sstop.scheduler.report())
+if sstop.time_to_first_frame is not None:
+    print('time to first frame %.0f ms' % (sstop.time_to_first_frame * 1e3))
+profiler.end_session()
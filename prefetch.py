@@ -0,0 +1,65 @@
+""" prefetch.py
+    Fetches the TMY data and timezone of a location on a worker thread so they are already in memory (the shared
+    tmy_cache memo and the timezone cache) by the time the clock is launched.  Picking another location cancels the
+    previous request if it hasn't started; a download already running finishes into the cache.
+    prefetch_many() fetches all the cities of a clock wall, these are never cancelled.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TmyPrefetcher:
+    """
+    Keeps at most one wanted location; prefetch() returns a Future that completes when the location is resident.
+    """
+
+    def __init__(self, workers=2, on_done=None):
+        """
+        :param workers: Size of the worker pool
+        :param on_done: Called with the Future when a prefetch completes, from the worker thread
+        """
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tmy-prefetch')
+        self.on_done = on_done
+        self.location = None
+        self.future = None
+
+    def prefetch(self, lat, lng):
+        """ Starts fetching the location unless it is already the wanted one and hasn't failed"""
+        if self.future is not None:
+            if self.location == (lat, lng) and not self.failed(self.future):
+                return self.future
+            self.future.cancel()
+        self.location = (lat, lng)
+        self.future = self.pool.submit(self.fetch, lat, lng)
+        self.future.add_done_callback(self.done)
+        return self.future
+
+    def prefetch_many(self, locations):
+        """ Starts fetching every (lat, lng) of locations.  Returns the list of Futures"""
+        futures = []
+        for lat, lng in locations:
+            future = self.pool.submit(self.fetch, lat, lng)
+            future.add_done_callback(self.done)
+            futures.append(future)
+        return futures
+
+    def done(self, future):
+        if self.on_done is not None and not future.cancelled():
+            self.on_done(future)
+
+    @staticmethod
+    def fetch(lat, lng):
+        # imported here so the gui thread never pays for pandas/pvlib at startup
+        from tmy_cache import default_cache
+        from timezones import tz_name
+        tz_name(lat, lng)
+        default_cache.get(lat, lng)
+        return lat, lng
+
+    @staticmethod
+    def failed(future):
+        """ True if the future finished without the data, a later prefetch of the location tries again"""
+        return future.done() and (future.cancelled() or future.exception() is not None)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,103 @@
+""" scheduler.py
+    Frame rate capped scheduling of the clock frames, so the loops sleep between frames instead of spinning.
+    The scheduler can drive a Tk root through after(), or share one thread with a PySimpleGUI control window:
+    poll() waits in Read() only until the next clock frame is due, so the clock keeps its own frame rate whether the
+    control window is idle or busy.
+    Frames are paced on deadlines one interval apart, so waking a little late doesn't lower the achieved rate.
+    It keeps a rolling record of the frames it ran to report the achieved FPS and the CPU time per frame.
+"""
+
+import math
+import time
+from collections import deque
+
+
+class FrameScheduler:
+    """
+    Runs frames no faster than the target FPS, and at idle_fps while the clock is idle (paused or past its endtime).
+    """
+
+    def __init__(self, fps=60, idle_fps=4, window=120):
+        """
+        :param fps:      Target frames per second
+        :param idle_fps: Frames per second while idle, enough to keep the window responsive
+        :param window:   Number of recent frames the statistics are computed over
+        """
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.frames = deque(maxlen=window)     # (wall start, wall seconds, cpu seconds) per frame
+        self.last_start = None
+        self.deadline = None                    # when the next frame is due at the target rate
+
+    def interval(self, idle=False):
+        """ Seconds between frames"""
+        return 1 / (self.idle_fps if idle else self.fps)
+
+    def due_in(self, idle=False):
+        """ Seconds until the next frame is due, 0 when it is due now"""
+        if self.last_start is None:
+            return 0.0
+        due = self.last_start + self.interval(idle)
+        if not idle:
+            due = min(due, self.deadline)
+        return max(0.0, due - time.perf_counter())
+
+    def tick(self, frame):
+        """ Runs one frame and records its wall and CPU time"""
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        frame()
+        self.frames.append((wall, time.perf_counter() - wall, time.process_time() - cpu))
+        self.last_start = wall
+
+        # the next deadline is one interval after this one, unless more than a frame behind (no catch up bursts)
+        interval = self.interval()
+        if self.deadline is None or wall > self.deadline + interval:
+            self.deadline = wall + interval
+        else:
+            self.deadline += interval
+
+    def poll(self, read, active, idle=False):
+        """ Waits for control window events no longer than until the next clock frame is due.
+
+        :param read:   Read method of the PySimpleGUI window
+        :param active: Bool, a clock is running and needs frames
+        :param idle:   Bool, the clock is paused
+        :return: the (event, values) of read
+        """
+        timeout = self.due_in(idle) if active else self.interval(idle=True)
+        return read(timeout=int(math.ceil(timeout * 1000)))
+
+    def run_due(self, frame, idle=False):
+        """ Runs the frame if it is due.  Returns True if it ran"""
+        if self.due_in(idle) > 0:
+            return False
+        self.tick(frame)
+        return True
+
+    def run_tk(self, root, frame, idle=None):
+        """ Drives frame from the Tk event loop with root.after(), call root.mainloop() afterwards.
+
+        :param root:  Tk widget to schedule on
+        :param frame: Callable drawing one frame
+        :param idle:  Callable returning True while the clock is idle
+        """
+        def loop():
+            self.tick(frame)
+            root.after(max(1, int(math.ceil(self.due_in(idle is not None and idle()) * 1000))), loop)
+        root.after(0, loop)
+
+    def achieved_fps(self):
+        if len(self.frames) < 2:
+            return 0.0
+        span = self.frames[-1][0] - self.frames[0][0]
+        return (len(self.frames) - 1) / span if span > 0 else 0.0
+
+    def cpu_per_frame(self):
+        """ Mean CPU seconds per frame"""
+        if not self.frames:
+            return 0.0
+        return sum(f[2] for f in self.frames) / len(self.frames)
+
+    def report(self):
+        return 'target %d fps, achieved %.1f fps, %.2f ms CPU per frame' % (self.fps, self.achieved_fps(), self.cpu_per_frame() * 1e3)
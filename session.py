@@ -0,0 +1,55 @@
+""" session.py
+    The position of the last clock run, saved by the gui on Pause and Close so the next session can resume the same
+    run where it was left.  Stop clears it.  The state is a small json dict:
+
+        {'run': {'locations': [[lat, lng], ...], 'start': 'June 01', 'end': 'June 08'}, 'elapsed_ns': 123456789}
+
+    Environment:
+        TMY_SESSION     path of the session file, default ~/.cache/tmy_clock/session.json, empty to disable saving
+"""
+
+import json
+import os
+import tempfile
+
+
+def session_path():
+    return os.environ.get('TMY_SESSION', os.path.join(os.path.expanduser('~'), '.cache', 'tmy_clock', 'session.json'))
+
+
+def save(state, path=None):
+    """ Writes the state dict, atomically so a crash never leaves half a file.  Does nothing when disabled"""
+    if path is None:
+        path = session_path()
+    if not path:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def load(path=None):
+    """ The saved state dict, None if there is none or it can't be read"""
+    if path is None:
+        path = session_path()
+    if not path:
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear(path=None):
+    """ Removes the saved state"""
+    if path is None:
+        path = session_path()
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
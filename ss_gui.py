@@ -1,37 +1,49 @@
-"""ss_gui module:  Graphical User Interface for the NIST Solar Array Simulator python code"""
+"""ss_gui module:  Graphical User Interface for the NIST Solar Array Simulator python code
+
+    Only PySimpleGUI is imported up front so the window shows immediately.  pvlib, pandas and the TMY_Clock module
+    are imported, and the SAM module library and timezone finder loaded, on a background thread once the window is up.
+
+    Stop keeps the clock window: the next Play restarts it in place with its tmy data, timezone and tables, unless the
+    locations changed.  A new module only rebuilds the clock's IV curves.  The position of the run is saved on Pause and Close (see session.py) and the next
+    Play of the same run resumes from it when 'Resume' is checked.  Stop forgets it.
+"""
 
 # standard library imports
 import math
+import threading
+import time
 
 # third party imports
-# pvlib-python
 import PySimpleGUI as sg
-import pvlib.pvsystem as pvsys
-from pvlib.location import Location
 
 from datetime import datetime, timedelta
 
-import pandas as pd
-
 # local modules and classes
-from TMY_Clock import TMY_Clock
+import session
+from city_index import city_index
+from prefetch import TmyPrefetcher
+from instrumentation import profiler
+from scheduler import FrameScheduler
 
 class SSTopGui:
     """ Top level GUI for the Solar Array Simulator Python code"""
 
-    def __init__(self, modlistname='SandiaMod', theme='Dark Grey 8'):
+    def __init__(self, modlistname='SandiaMod', theme='Dark Grey 8', fps=60):
         """
         :param modlistname: The name of the module list to get module data from.
                             Must match of the module lists in the pvlib-python data folder
         :type modlistname: string
         :param theme: color theme for the PySimpleGui window
         :type theme: string
+        :param fps: target frame rate of the TMY clock
+        :type fps: int
         """
 
-        self.modules = pvsys.retrieve_sam(modlistname)
-        module_names = self.modules.columns.values.tolist()
-        combo_modules = sg.DD(module_names,
-                              default_value='SunPower_SPR_220_BLK_U_Module___2008_',
+        self.modlistname = modlistname
+        self.modules = []   # placeholder for the SAM module library, loaded in the background
+        self.default_module = 'SunPower_SPR_220_BLK_U_Module___2008_'
+        combo_modules = sg.DD([self.default_module],
+                              default_value=self.default_module,
                               key='-MODULES-',
                               enable_events=True)    # Modules drop down
         self.theme = sg.theme(theme)
@@ -39,11 +51,23 @@ class SSTopGui:
                            icon='GS-PV-array-icon.png',
                            )
         self.window = []    # placeholder for the gui window object
-        self.clk = []       # placeholder for the TMY_Clock object
+        self.clk = []       # placeholder for the TMY_Clock or ClockWall object
         self.state = "OPEN"
-
-        # cityPicker object
-        self.cp = CityPicker()
+        self.scheduler = FrameScheduler(fps=fps)
+        self.pending = False            # Play was pressed, the clock launches when its TMY data is resident
+        self.play_time = None           # perf_counter when Play was pressed, until the first frame is drawn
+        self.time_to_first_frame = None
+        self.frames_drawn = 0
+        self.wall = []                  # (lat, lng, name) of the cities added to the clock wall
+        self.wall_fetch = None          # (locations, futures) of the wall prefetch Play is waiting for
+        self.stopped = True             # the clock window, if any, is at the start of a run waiting for Play
+        self.clock_config = None        # (locations, wall, module) the clock window was built for
+        self.run = None                 # session.py run description of the clock's current run
+        self.saved = session.load()     # last saved session state, None if there is none
+
+        # cityPicker object, fetches the TMY data of the selected city in the background
+        self.prefetcher = TmyPrefetcher(on_done=self.prefetch_done)
+        self.cp = CityPicker(prefetcher=self.prefetcher)
 
         today = datetime.today().strftime('%B %d')
         tomorrow = (datetime.today()+timedelta(1)).strftime('%B %d')
@@ -58,58 +82,238 @@ class SSTopGui:
             [sg.Input(today, key='-START-', size=(14, 1), disabled=True, disabled_readonly_background_color='', justification='center'), sg.Input(tomorrow, key='-END-', size=(14,1), disabled=True, disabled_readonly_background_color='', justification='center')],
             [sg.CalendarButton('Start Date', close_when_date_chosen=True, target='-START-', no_titlebar=True, format='%B %d'), sg.CalendarButton('End Date', close_when_date_chosen=True, target='-END-', no_titlebar=True, format='%B %d')],
             [sg.Slider(range=(0,15),orientation='h', disable_number_display=True,enable_events=True, key='-SLIDER-'),sg.Text('Speed x'),sg.Input(1, key='-SPEED-',size=(4,1), disabled=True, disabled_readonly_background_color='')],
+            [sg.Button('Add to wall', key='-ADDWALL-'), sg.Button('Clear wall', key='-CLEARWALL-'), sg.Text('', key='-WALLCOUNT-', size=(12, 1))],
             [sg.Button(image_filename='play.png', image_subsample=5, key='-PLAY-', disabled=False), sg.Button(image_filename='pause.png', image_subsample=5, key='-PAUSE-', disabled=True), sg.Button(image_filename='stop.png', image_subsample=5, key='-STOP-', disabled=True)],
+            [sg.Checkbox('Resume', key='-RESUME-', default=self.saved is not None, tooltip='continue the last run of the same cities and dates')],
+            [sg.Text('Loading...', key='-STATUS-', size=(30, 1), justification='center')],
+            [sg.Checkbox('Profile', key='-PROFILE-', default=profiler.enabled, enable_events=True), sg.Text('', key='-PROFILE-FPS-', size=(36, 1))],
             [sg.Cancel("Close")]
         ]
 
     def launch_clock(self):
-        """ launched the TMY Clock window"""
-        if self.clk == []:
-            starttime = datetime.strptime(self.window.Element('-START-').get(), '%B %d')
-            endtime = datetime.strptime(self.window.Element('-END-').get(), '%B %d')
-            self.clk = TMY_Clock(speed=int(self.window.Element("-SPEED-").get()), starttime=starttime, endtime=endtime, nosecond=False)
+        """ launches the TMY Clock window, or restarts it in place if it is stopped and still shows the same
+            locations, or waits for the prefetch of the TMY data if it is still running
+        """
+        if self.clk != [] and not self.stopped:
+            self.clk.pause = False
+            return
+
+        starttime = datetime.strptime(self.window.Element('-START-').get(), '%B %d')
+        endtime = datetime.strptime(self.window.Element('-END-').get(), '%B %d')
+        speed = int(self.window.Element("-SPEED-").get())
+        run = self.run_key()
+        module = self.window['-MODULES-'].get() if self.wall == [] and len(self.modules) else None
+        if self.clk != [] and (not self.clk.alive() or self.clock_config[:2] != (run['locations'], self.wall != [])):
+            self.close_clock()
+
+        if self.clk != []:
+            if self.clock_config[2] != module:
+                # only the IV curves depend on the module
+                self.clk.set_module(self.modules[module] if module is not None else None)
+                self.clock_config = (run['locations'], self.wall != [], module)
+            self.clk.restart(starttime, endtime, speed)
+        else:
+            # the TMY data of every location must be resident so the gui thread never downloads
+            if self.wall != []:
+                locations = [w[0:2] for w in self.wall]
+                if self.wall_fetch is None or self.wall_fetch[0] != locations:
+                    self.wall_fetch = (locations, self.prefetcher.prefetch_many(locations))
+                futures = self.wall_fetch[1]
+            else:
+                futures = [self.prefetcher.prefetch(self.cp.lat, self.cp.lng)]
+            if not all(future.done() for future in futures):
+                self.pending = True
+                self.window['-STATUS-'].update('Loading TMY data... %d/%d' % (sum(f.done() for f in futures), len(futures)))
+                return
+            self.pending = False
+            self.wall_fetch = None
+            errors = [f.exception() for f in futures if not f.cancelled() and f.exception() is not None]
+            if any(f.cancelled() for f in futures) or errors:
+                self.window['-STATUS-'].update('TMY data: %s' % (errors[0] if errors else 'cancelled'))
+                self.stop_buttons()
+                return
+            try:
+                if self.wall != []:
+                    # one window with a clock per city of the wall
+                    from clock_wall import ClockWall
+                    self.clk = ClockWall(locations, names=[w[2] for w in self.wall], speed=speed, starttime=starttime, endtime=endtime)
+                else:
+                    from TMY_Clock import TMY_Clock
+                    # the selected module's IV curves once the module library has loaded
+                    iv_module = self.modules[module] if module is not None else None
+                    self.clk = TMY_Clock(lat=self.cp.lat, lng=self.cp.lng, speed=speed, starttime=starttime, endtime=endtime, nosecond=False, module=iv_module)
+            except Exception as e:
+                # e.g. the data was evicted from the cache and the download failed
+                self.window['-STATUS-'].update('TMY data: %s' % e)
+                self.stop_buttons()
+                return
+            self.clock_config = (run['locations'], self.wall != [], module)
+
+        # pick up the saved position of the same run
+        self.run = run
+        self.stopped = False
+        if self.window['-RESUME-'].get() and self.saved is not None and self.saved.get('run') == run:
+            self.clk.seek(self.saved['elapsed_ns'])
+        self.window['-STATUS-'].update('')
         self.clk.pause = False
 
+    def run_key(self):
+        """ The selected run as saved in the session file: the locations and the start and end dates"""
+        locations = [list(w[0:2]) for w in self.wall] if self.wall != [] else [[self.cp.lat, self.cp.lng]]
+        return {'locations': locations, 'start': self.window.Element('-START-').get(), 'end': self.window.Element('-END-').get()}
+
+    def save_session(self):
+        """ Saves the position of the clock's run for the next Play or session"""
+        if self.clk != [] and self.run is not None and not self.stopped:
+            self.saved = {'run': self.run, 'elapsed_ns': self.clk.position}
+            session.save(self.saved)
+
+    def clear_session(self):
+        """ Forgets the saved position, Stop means the next Play starts from the beginning"""
+        self.saved = None
+        session.clear()
+
+    def close_clock(self):
+        if self.clk.alive():
+            self.clk.destroy()
+        self.clk = []
+        self.stopped = True
+
+    def post(self, event, value=None):
+        """ Sends an event to the gui thread from a worker thread, unless the window has been closed"""
+        if self.window != [] and self.state == 'OPEN':
+            self.window.write_event_value(event, value)
+
+    def prefetch_done(self, future):
+        """ From the prefetch worker, wakes the gui thread in case it is waiting to launch the clock"""
+        self.post('-TMY-READY-')
+
+    def stop_buttons(self):
+        self.window['-PLAY-'].update(disabled=False)
+        self.window['-PAUSE-'].update(disabled=True)
+        self.window['-STOP-'].update(disabled=True)
+
     def start_gui(self):
         self.window = sg.Window('NIST Solar Simulation', self.layout, element_justification='center', finalize=True)
+        threading.Thread(target=self.load_in_background, daemon=True).start()
+
+    def load_in_background(self):
+        """ Imports and loads the slow pieces after the window is shown, the gui thread gets
+            -MODULES-LOADED- with the module library and then -LOADED-, or -LOAD-FAILED- with the error
+        """
+        try:
+            import pvlib.pvsystem as pvsys
+            self.post('-MODULES-LOADED-', pvsys.retrieve_sam(self.modlistname))
+
+            import TMY_Clock
+            from timezones import finder
+            finder()
+        except Exception as e:
+            self.post('-LOAD-FAILED-', e)
+            return
+        self.post('-LOADED-')
 
     def run_gui(self):
         """ looks for element events """
 
-        event, values = self.window.Read(timeout = 100)
+        # wait for events until the next clock frame is due, slowly when there is no clock or it is paused.
+        # The clock is drawn on its own schedule below, however many control events arrive
+        with profiler.phase('event read'):
+            event, values = self.scheduler.poll(self.window.Read, self.clk != [], idle=self.clk != [] and self.clk.pause)
         if event in (sg.WIN_CLOSED, 'Close'):
+            self.save_session()
             self.window.close()
+            self.prefetcher.shutdown()
             self.state="CLOSED"
+        if event == '-MODULES-LOADED-':
+            self.modules = values[event]
+            self.window['-MODULES-'].update(values=self.modules.columns.values.tolist(), value=self.default_module)
+        if event == '-LOADED-' and not self.pending:
+            self.window['-STATUS-'].update('')
+        if event == '-LOAD-FAILED-':
+            self.window['-STATUS-'].update('Loading failed: %s' % values[event])
+        if event == '-TMY-READY-' and self.pending:
+            self.launch_clock()
+        if event == '-PROFILE-':
+            if not values['-PROFILE-']:
+                print(profiler.report())
+            profiler.toggle(values['-PROFILE-'])
+            self.window['-PROFILE-FPS-'].update('')
         if event == '-COUNTRY-':
             self.cp.countrychanged(values['-COUNTRY-'])
         if event == '-CITY-':
             self.cp.citychanged(values['-CITY-'])
         if event == '-SLIDER-':
             self.window.Element('-SPEED-').Update(2**int(values['-SLIDER-']))
-            if type(self.clk) == TMY_Clock:
+            if self.clk != []:
                 self.clk.speed = int(self.window.Element("-SPEED-").get())
+        if event == '-ADDWALL-':
+            if (self.cp.lat, self.cp.lng, self.cp.name) not in self.wall:
+                self.wall.append((self.cp.lat, self.cp.lng, self.cp.name))
+            self.window['-WALLCOUNT-'].update('wall: %d cities' % len(self.wall))
+        if event == '-CLEARWALL-':
+            self.wall = []
+            self.window['-WALLCOUNT-'].update('')
         if event == '-PLAY-':
             self.window['-PLAY-'].update(disabled=True)
             self.window['-PAUSE-'].update(disabled=False)
             self.window['-STOP-'].update(disabled=False)
+            if self.clk == [] or self.stopped:
+                self.play_time = time.perf_counter()
             self.launch_clock()
         if event == '-STOP-':
-            self.window['-PLAY-'].update(disabled=False)
-            self.window['-PAUSE-'].update(disabled=True)
-            self.window['-STOP-'].update(disabled=True)
-            self.clk.destroy()
-            self.clk = []
+            self.stop_buttons()
+            self.pending = False
+            self.play_time = None
+            if self.clk != [] and not self.stopped:
+                # the window stays up, the next Play restarts it in place from the start
+                self.clear_session()
+                self.clk.stop()
+                self.stopped = True
         if event == '-PAUSE-':
             self.window['-PLAY-'].update(disabled=False)
             self.window['-PAUSE-'].update(disabled=True)
             self.window['-STOP-'].update(disabled=False)
-            self.clk.pause = True
+            if self.clk != []:
+                self.clk.pause = True
+                self.save_session()
+            else:
+                self.pending = False
+
+        # the clock window may have been closed by the user
+        if self.clk != [] and not self.clk.alive():
+            self.close_clock()
+            self.stop_buttons()
 
         # if the clock is running
-        if type(self.clk) == TMY_Clock:
+        if self.clk != []:
+            self.scheduler.run_due(self.clock_frame, idle=self.clk.pause)
+
+    def clock_frame(self):
+        with profiler.phase('tk update'):
             self.clk.update()
             self.clk.update_idletasks()
-            self.clk.update_class()
+        # the clock's close event is handled in update(), its canvas is gone
+        if not self.clk.alive():
+            self.close_clock()
+            self.stop_buttons()
+            return
+        self.clk.update_class()
+        profiler.frame_done()
+
+        # rolling frame rate and slowest phase while profiling, refreshed about once a second
+        self.frames_drawn += 1
+        if profiler.enabled and self.frames_drawn % self.scheduler.fps == 0:
+            stats = profiler.stats()
+            slowest = max(stats, key=lambda name: stats[name][1]) if stats else ''
+            calls = profiler.counts().get('tk calls', (0.0, 0))[0]
+            self.window['-PROFILE-FPS-'].update('%.0f fps, p99 %s, %.1f Tk calls' % (profiler.fps(), slowest, calls))
+
+        # time from pressing Play to the first drawn frame
+        if self.play_time is not None:
+            self.time_to_first_frame = time.perf_counter() - self.play_time
+            self.play_time = None
+            self.window['-STATUS-'].update('first frame in %.0f ms' % (self.time_to_first_frame * 1e3))
 
 
 class CityPicker:
@@ -120,7 +324,7 @@ class CityPicker:
 
     """
 
-    def __init__(self, default_country='United States', default_city='Gaithersburg - Maryland'):
+    def __init__(self, default_country='United States', default_city='Gaithersburg - Maryland', prefetcher=None):
         """
         :param default_country:         Choice to be displayed as initial country value.
                                         Must match a country value from the worldcities.csv
@@ -128,43 +332,37 @@ class CityPicker:
         :param default_city:            Choice to be displayed as intital city value.
                                         Must match city_ascii - admin_name fields from corldcities.csv
         :type default_city:             string
+        :param prefetcher:              Optional TmyPrefetcher, fetches the TMY data of each city picked
+        :type prefetcher:               TmyPrefetcher
         """
+        self.prefetcher = prefetcher
 
-        self.worldcities = pd.read_csv('worldcities.csv', usecols=['country', 'city_ascii', 'admin_name', 'lat', 'lng'])
-        self.worldcities = self.worldcities.sort_values(by=['country', 'city_ascii'])
-        countrylist = self.worldcities['country'].drop_duplicates()
-        self.ddCountry = sg.DD(countrylist.values.tolist(),
-                               default_value='United States',
+        self.worldcities = city_index('worldcities.csv')
+        self.country = default_country
+        self.ddCountry = sg.DD(self.worldcities.countries(),
+                               default_value=default_country,
                                key='-COUNTRY-',
                                enable_events=True)
-        citylist = self.worldcities.loc[self.worldcities['country'] == default_country]
-        city_admin = citylist['city_ascii'] + ' - ' + citylist['admin_name']
-        self.ddCity = sg.DD(city_admin.values.tolist(),
+        self.ddCity = sg.DD(self.worldcities.cities_in(default_country),
                             default_value=default_city,
                             key='-CITY-',
                             enable_events=True)
 
-        # instantiate a pvlib location object
-        self.loc = []
         self.update_loc(default_city)
-        self.txt_lat = sg.Text(self.loc.latitude)
-        self.txt_lng = sg.Text(self.loc.longitude)
+        self.txt_lat = sg.Text(self.lat)
+        self.txt_lng = sg.Text(self.lng)
 
     def countrychanged(self, key):
         """Called when the country combo box is changed by the user
             :param key
             :type  string
             """
-        citylist = self.worldcities.loc[self.worldcities['country'] == key]
-        city_admin = citylist['admin_name']
-        if isinstance(city_admin.values[0],str): # some data entries have no admin_name
-            city_admin = citylist['city_ascii'] + ' - ' + citylist['admin_name']
-        else:
-            city_admin = citylist['city_ascii'] + ' - ' + ""
-        self.ddCity.update(values=city_admin.values.tolist(), set_to_index=0)
-        self.update_loc(city_admin.values[0])
-        self.txt_lat.update(self.loc.latitude)
-        self.txt_lng.update(self.loc.longitude)
+        self.country = key
+        city_admin = self.worldcities.cities_in(key)
+        self.ddCity.update(values=city_admin, set_to_index=0)
+        self.update_loc(city_admin[0])
+        self.txt_lat.update(self.lat)
+        self.txt_lng.update(self.lng)
 
     def citychanged(self, key):
         """Called when the city combo box is changed by the user
@@ -172,36 +370,43 @@ class CityPicker:
              :type  string
              """
         self.update_loc(key)
-        self.txt_lat.update(self.loc.latitude)
-        self.txt_lng.update(self.loc.longitude)
+        self.txt_lat.update(self.lat)
+        self.txt_lng.update(self.lng)
 
     def update_loc(self,key):
         """
             Update the location to the new location
-        :param key:
+        :param key: 'city - admin' label of a city in the current country
         :return:
         """
         # latitude and longitude
-        [city, state] = key.split(' - ')
-        if state != '':    # some data entries have no admin_name
-            row = self.worldcities[((self.worldcities['city_ascii'] == city) & (self.worldcities['admin_name'] == state))]
-        else:
-            row = self.worldcities[((self.worldcities['city_ascii'] == city))]
-        lat = float(row['lat'].to_numpy()[0])
-        lng = longitude = float(row['lng'].to_numpy()[0])
-        self.loc = Location(latitude=lat, longitude=lng, name=city)
+        self.lat, self.lng = self.worldcities.location(self.country, key)
+        self.name = key.split(' - ')[0]
+        if self.prefetcher is not None:
+            self.prefetcher.prefetch(self.lat, self.lng)
+
+    @property
+    def loc(self):
+        """ pvlib Location of the selected city, pvlib is imported on first use"""
+        from pvlib.location import Location
+        return Location(latitude=self.lat, longitude=self.lng, name=self.name)
 
 
 
 
 
 def main():
+    profiler.start_session()
     sstop = SSTopGui()
     sstop.start_gui()
     while 1:
         if sstop.state == "CLOSED":
             break
         sstop.run_gui()
+    print(sstop.scheduler.report())
+    if sstop.time_to_first_frame is not None:
+        print('time to first frame %.0f ms' % (sstop.time_to_first_frame * 1e3))
+    profiler.end_session()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+""" stand_ins.py
+    Synthetic TMY data, and stand-ins for the Tk canvas, the clock windows and the PySimpleGUI control window, so the
+    benchmarks and tests need no network or display.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_tmy(seed=0):
+    """ Returns a tuple shaped like iotools.get_pvgis_tmy(): 8760 hourly UTC rows with each month from a different
+        year, and a ghi column following a clipped daily sine.
+    """
+    rng = np.random.default_rng(seed)
+    months = []
+    for month in range(1, 13):
+        year = 2005 + (month % 11)
+        start = pd.Timestamp(year=year, month=month, day=1, tz='UTC')
+        months.append(pd.date_range(start, start + pd.offsets.MonthBegin(1), freq='h', inclusive='left'))
+    index = months[0].append(months[1:])
+    # drop Feb 29 so every TMY has 8760 rows like PVGIS
+    index = index[~((index.month == 2) & (index.day == 29))]
+    hour = index.hour.to_numpy()
+    ghi = np.clip(np.sin((hour - 6) / 12 * np.pi), 0, None) * 1000 * rng.uniform(0.5, 1.0, len(index))
+    data = pd.DataFrame({'ghi': ghi, 'dni': ghi * 0.8, 'dhi': ghi * 0.2, 'temp_air': 15.0}, index=index)
+    return data, None, None, None
+
+
+class CountingCanvas:
+    """ Stands in for the Tk canvas and date label, counts the calls a frame makes"""
+    def __init__(self):
+        self.calls = 0
+
+    def coords(self, *args):
+        self.calls += 1
+
+    def itemconfig(self, *args, **kwargs):
+        self.calls += 1
+
+    def config(self, *args, **kwargs):
+        self.calls += 1
+
+
+def headless_clock(engine):
+    """ A TMY_Clock around engine drawing on a CountingCanvas, without a display.  The run controls (stop, restart,
+        seek) and update_class work on it, Tk calls don't.
+    """
+    from TMY_Clock import TMY_Clock
+    from clock_render import ClockRenderer
+
+    clock = TMY_Clock.__new__(TMY_Clock)
+    clock.engine = engine
+    clock.tmy = engine.tmy
+    clock.canvas = CountingCanvas()
+    clock.renderer = ClockRenderer(clock.canvas, 1, [2, 3, 4], clock.canvas, 154, 154, [100, 125, 125])
+    return clock
+
+
+def headless_wall(engine):
+    """ A ClockWall of three clocks around a WallEngine drawing on a CountingCanvas, without a display"""
+    from clock_wall import ClockWall, WallRenderer
+
+    wall = ClockWall.__new__(ClockWall)
+    wall.engine = engine
+    wall.canvas = CountingCanvas()
+    count = len(engine.engines)
+    wall.renderer = WallRenderer(wall.canvas, [(75, 115)] * count, list(range(count)), [[1, 2, 3]] * count, 0, [45, 60, 60])
+    return wall
+
+
+class StandInElement:
+    """ Stands in for a PySimpleGUI element, records its updates"""
+    def __init__(self, value=''):
+        self.value = value
+        self.updates = []
+
+    def update(self, *args, **kwargs):
+        self.updates.append((args, kwargs))
+
+    Update = update
+
+    def get(self):
+        return self.value
+
+
+class StandInWindow:
+    """ Stands in for the PySimpleGUI control window: Read() returns the queued and written events first, then waits
+        out its timeout, or returns an event every event_interval seconds to simulate a busy window (slider drags etc.)
+    """
+    def __init__(self, event_interval=None, events=(), values=None):
+        """
+        :param event_interval: seconds between the events of a busy window, None for an idle one
+        :param events:         events Read() returns first
+        :param values:         {key: value} the elements' get() returns
+        """
+        self.event_interval = event_interval
+        self.events = [(event, {}) for event in events]
+        self.elements = {key: StandInElement(value) for key, value in (values or {}).items()}
+
+    def __getitem__(self, key):
+        return self.elements.setdefault(key, StandInElement())
+
+    Element = __getitem__
+
+    def write_event_value(self, event, value):
+        self.events.append((event, {event: value}))
+
+    def Read(self, timeout=None):
+        if self.events:
+            return self.events.pop(0)
+        wait = timeout / 1000
+        if self.event_interval is not None and self.event_interval < wait:
+            time.sleep(self.event_interval)
+            return '-BUSY-', {}
+        time.sleep(wait)
+        return '__TIMEOUT__', {}
+
+
+class StandInClock:
+    """ Stands in for the clock window in the gui loop: the Tk updates do nothing and each frame draws clock, a
+        headless_clock, if given.  With close set the user closes the window during the next update()
+    """
+    def __init__(self, clock=None, close=False):
+        self.clock = clock
+        self.close = close
+        self.open = True
+        self.frames = 0
+        self._pause = False
+
+    @property
+    def pause(self):
+        return self.clock.pause if self.clock is not None else self._pause
+
+    @pause.setter
+    def pause(self, pause):
+        if self.clock is not None:
+            self.clock.pause = pause
+        self._pause = pause
+
+    def update(self):
+        if self.close:
+            self.open = False
+
+    def update_idletasks(self):
+        pass
+
+    def alive(self):
+        return self.open
+
+    def destroy(self):
+        self.open = False
+
+    def update_class(self):
+        assert self.open, 'drawing on a destroyed window'
+        if self.clock is not None:
+            self.clock.update_class()
+        self.frames += 1
+
+
+def standin_gui(window, clock, fps=60):
+    """ An ss_gui.SSTopGui running clock in window, without building the PySimpleGUI layout"""
+    from scheduler import FrameScheduler
+    from ss_gui import SSTopGui
+
+    top = SSTopGui.__new__(SSTopGui)
+    top.window = window
+    top.clk = clock
+    top.state = 'OPEN'
+    top.scheduler = FrameScheduler(fps=fps, window=100000)
+    top.pending = False
+    top.play_time = None
+    top.time_to_first_frame = None
+    top.frames_drawn = 0
+    top.stopped = False
+    return top
@@ -0,0 +1,111 @@
+""" ClockEngine runs: fixed step time source, warm restart and session resume"""
+from datetime import datetime
+
+import pytest
+from pytz import timezone
+
+import session
+from TMY_Clock import ClockEngine, tmy
+from stand_ins import synthetic_tmy
+from time_source import FixedStepSource
+from tmy_cache import tmy_cache
+
+LAT, LNG = 39.13, -77.21
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """ A tmy_cache seeded with the synthetic year whose backend fails, so any download is an error"""
+    def backend(lat, lng):
+        raise AssertionError('downloaded %s, %s' % (lat, lng))
+    cache = tmy_cache(cachedir=str(tmp_path / 'cache'), backend=backend)
+    cache.seed(LAT, LNG, synthetic_tmy()[0])
+    return cache
+
+
+@pytest.fixture
+def data():
+    return tmy(tz=timezone('America/New_York'), tmydata=synthetic_tmy())
+
+
+def run_to_end(engine):
+    frames = 0
+    while not engine.pause:
+        engine.advance()
+        frames += 1
+    return frames
+
+
+def test_fixed_step_run_ends_on_endtime(data):
+    tz = data.tz
+    start = tz.localize(datetime(2000, 3, 1))
+    end = tz.localize(datetime(2000, 11, 2, 13, 7))
+    runs = []
+    for n in range(2):
+        engine = ClockEngine(data, start, end, 3000, FixedStepSource(1 / 60))
+        frames = run_to_end(engine)
+        assert engine.displaytime == end
+        assert engine.elapsed_ns == engine.span_ns
+        runs.append((frames, engine.elapsed_ns))
+    assert runs[0] == runs[1]
+
+
+def test_step_frames_matches_advance(data):
+    tz = data.tz
+    start = tz.localize(datetime(2000, 6, 1))
+    end = tz.localize(datetime(2000, 6, 3))
+    stepped = ClockEngine(data, start, end, 4096, FixedStepSource(1 / 60))
+    frames = run_to_end(stepped)
+    batch = ClockEngine(data, start, end, 4096)
+    batch.step_frames(frames, 1 / 60)
+    assert batch.pause
+    assert batch.elapsed_ns == stepped.elapsed_ns
+    assert batch.displaytime == stepped.displaytime == end
+
+
+def test_warm_restart_reuses_tmy(cache, monkeypatch):
+    engine = ClockEngine.for_location(LAT, LNG, datetime(2000, 6, 1), datetime(2000, 6, 8), cache=cache)
+    engine.tmy.minute_series()
+    fetches = []
+    monkeypatch.setattr(cache, 'get', lambda *args: fetches.append(args))
+
+    restarted = engine.restarted(datetime(2000, 7, 1), datetime(2000, 7, 2), speed=64)
+    assert restarted.tmy is engine.tmy
+    assert restarted.tmy._minutes is engine.tmy._minutes
+    assert restarted.tz is engine.tz
+    assert restarted.source is engine.source
+    assert fetches == []
+    assert restarted.starttime == engine.tz.localize(datetime(2000, 7, 1))
+    assert restarted.speed == 64 and restarted.elapsed_ns == 0 and not restarted.pause
+
+
+def test_seek_and_session_round_trip(data, tmp_path):
+    tz = data.tz
+    start = tz.localize(datetime(2000, 6, 1))
+    end = tz.localize(datetime(2000, 6, 8))
+    engine = ClockEngine(data, start, end, 1)
+    position = 36 * 3600 * 10 ** 9 + 123456789
+    engine.seek(position)
+    path = str(tmp_path / 'session.json')
+    session.save({'run': {'locations': [[LAT, LNG]], 'start': 'June 01', 'end': 'June 08'},
+                  'elapsed_ns': engine.elapsed_ns}, path)
+
+    resumed = ClockEngine(data, start, end, 1)
+    state = session.load(path)
+    resumed.seek(state['elapsed_ns'])
+    assert resumed.elapsed_ns == position
+    assert resumed.displaytime == engine.displaytime
+    assert state['run']['locations'] == [[LAT, LNG]]
+
+    session.clear(path)
+    assert session.load(path) is None
+
+
+def test_seek_past_endtime_pauses_on_it(data):
+    tz = data.tz
+    start = tz.localize(datetime(2000, 6, 1))
+    end = tz.localize(datetime(2000, 6, 2))
+    engine = ClockEngine(data, start, end, 1)
+    engine.seek(10 ** 18)
+    assert engine.pause
+    assert engine.displaytime == end
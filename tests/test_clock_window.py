@@ -0,0 +1,129 @@
+""" The Tk clock windows: a failed launch opens no window, and the run controls and their latency behind a stand-in canvas"""
+import time
+from datetime import datetime
+
+import pytest
+
+import TMY_Clock
+import clock_wall
+from stand_ins import synthetic_tmy, headless_clock, headless_wall
+from time_source import FixedStepSource
+from tmy_cache import tmy_cache
+
+LAT, LNG = 39.13, -77.21
+
+
+class FetchFailed(Exception):
+    pass
+
+
+def fail(*args, **kwargs):
+    raise FetchFailed('evicted and the download failed')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """ A tmy_cache seeded with the synthetic year that never downloads"""
+    cache = tmy_cache(cachedir=str(tmp_path / 'cache'), offline=True)
+    cache.seed(LAT, LNG, synthetic_tmy()[0])
+    return cache
+
+
+@pytest.fixture
+def windows(monkeypatch):
+    """ Records the Tk roots created"""
+    opened = []
+    monkeypatch.setattr(TMY_Clock.Tkinter.Tk, '__init__', lambda self, *args: opened.append(self))
+    return opened
+
+
+def test_failed_clock_opens_no_window(windows, monkeypatch):
+    monkeypatch.setattr(TMY_Clock.ClockEngine, 'for_location', fail)
+    with pytest.raises(FetchFailed):
+        TMY_Clock.TMY_Clock(starttime=datetime(2000, 6, 1))
+    assert windows == []
+
+
+def test_failed_wall_opens_no_window(windows, monkeypatch):
+    monkeypatch.setattr(clock_wall.WallEngine, 'for_locations', fail)
+    with pytest.raises(FetchFailed):
+        clock_wall.ClockWall([(39.13, -77.21), (38.72, -9.14)], starttime=datetime(2000, 6, 1))
+    assert windows == []
+
+
+@pytest.fixture(params=['clock', 'wall'])
+def window(request, cache, monkeypatch):
+    start, end = datetime(2000, 6, 1), datetime(2000, 6, 8)
+    if request.param == 'clock':
+        return headless_clock(TMY_Clock.ClockEngine.for_location(LAT, LNG, start, end, 4096, FixedStepSource(1 / 60),
+                                                                 cache=cache))
+    # the wall's engines fetch through the shared cache
+    monkeypatch.setattr(TMY_Clock, 'default_cache', cache)
+    return headless_wall(clock_wall.WallEngine.for_locations([(LAT, LNG)] * 3, start, end, 4096,
+                                                            source=FixedStepSource(1 / 60)))
+
+
+def driving(engine):
+    """ The ClockEngine driving a ClockEngine or WallEngine"""
+    return getattr(engine, 'clock', engine)
+
+
+def test_stop_and_restart(window):
+    tmydata = driving(window.engine).tmy
+    for i in range(10):
+        window.update_class()
+    assert window.position > 0
+
+    window.stop()
+    assert window.pause and window.position == 0
+    assert window.displaytime == window.starttime
+
+    calls = window.canvas.calls
+    window.restart(datetime(2000, 7, 1), datetime(2000, 7, 2), speed=64)
+    assert window.pause and window.position == 0 and window.speed == 64
+    assert window.starttime.month == 7 and window.endtime.day == 2
+    assert driving(window.engine).tmy is tmydata
+    # the restart redraws everything
+    assert window.canvas.calls > calls
+
+    window.seek(3600 * 10 ** 9)
+    assert window.displaytime.hour == 1
+
+
+def test_warm_restart_latency(window, cache, monkeypatch):
+    """ Play after Stop restarts the retained window in place: no fetch, and well under a frame"""
+    fetches = []
+    monkeypatch.setattr(cache, 'get', lambda *args: fetches.append(args))
+    driving(window.engine).tmy.minute_series()
+    window.stop()
+    window.restart(datetime(2000, 7, 1), datetime(2000, 7, 2))
+
+    seconds = []
+    for i in range(50):
+        window.stop()
+        begin = time.perf_counter()
+        window.restart(datetime(2000, 7, 1), datetime(2000, 7, 2))
+        seconds.append(time.perf_counter() - begin)
+    assert fetches == []
+    assert sorted(seconds)[len(seconds) // 2] < 0.005
+    assert max(seconds) < 0.05
+
+
+def test_iv_curve_on_demand(cache):
+    pvsystem = pytest.importorskip('pvlib.pvsystem')
+    module = pvsystem.retrieve_sam('SandiaMod')['SunPower_SPR_220_BLK_U_Module___2008_']
+    clock = headless_clock(TMY_Clock.ClockEngine.for_location(LAT, LNG, datetime(2000, 6, 1, 12), datetime(2000, 6, 8),
+                                                              cache=cache))
+    assert clock.curve is None
+
+    engine = clock.engine
+    clock.set_module(module)
+    assert clock.engine is engine
+    v, i = clock.curve
+    assert len(v) == len(i) == 5 and i[0] > 0
+
+    # the IV curves carry over to the next run
+    clock.restart(datetime(2000, 7, 1, 12), datetime(2000, 7, 2))
+    assert clock.curve is not None
+    clock.set_module(None)
+    assert clock.curve is None
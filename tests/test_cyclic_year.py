@@ -0,0 +1,49 @@
+""" tmy: the cyclic year"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+from pytz import timezone
+
+from TMY_Clock import ClockEngine, tmy, TMY_YEAR
+from stand_ins import synthetic_tmy
+
+
+@pytest.fixture
+def data():
+    return tmy(tz=timezone('America/New_York'), tmydata=synthetic_tmy())
+
+
+def test_year_is_filled_and_wraps(data):
+    assert len(data.tmy_slice) == 366 * 24
+    assert data.period == TMY_YEAR.total_seconds()
+    ts = data.epoch[1234] + 1800.0
+    assert data.ghi_at(ts) == data.ghi_at(ts + data.period) == data.ghi_at(ts - 3 * data.period)
+    feb28 = data.tmy_slice[(data.tmy_slice.index.month == 2) & (data.tmy_slice.index.day == 28)]['ghi'].to_numpy()
+    feb29 = data.tmy_slice[(data.tmy_slice.index.month == 2) & (data.tmy_slice.index.day == 29)]['ghi'].to_numpy()
+    np.testing.assert_array_equal(feb28, feb29)
+
+
+def test_ghi_many_matches_ghi_at(data):
+    ts = data.base + np.linspace(-data.period, 2 * data.period, 500)
+    np.testing.assert_array_equal(data.ghi_many(ts), [data.ghi_at(t) for t in ts])
+
+
+def test_run_across_new_year(data):
+    tz = data.tz
+    start = tz.localize(datetime(2000, 12, 31, 12))
+    end = tz.localize(datetime(2000, 1, 1, 12))    # before the start, so in the next year
+    engine = ClockEngine(data, start, end, 1)
+    assert engine.span == 24 * 3600
+    engine.seek(18 * 3600 * 10 ** 9)
+    assert engine.displaytime == tz.localize(datetime(2000, 1, 1, 6))
+    assert engine.ghi() == data.ghi_at(tz.localize(datetime(2001, 1, 1, 6)).timestamp())
+
+
+def test_indefinite_run_loops(data):
+    tz = data.tz
+    start = tz.localize(datetime(2000, 6, 1))
+    engine = ClockEngine(data, start, None, 1)
+    engine.seek(int(TMY_YEAR.total_seconds()) * 10 ** 9)
+    assert not engine.pause
+    assert engine.displaytime == start
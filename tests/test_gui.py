@@ -0,0 +1,102 @@
+""" SSTopGui run_gui and clock_frame with stand-ins for the control window and the clock window, no display needed"""
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+from pytz import timezone
+
+pytest.importorskip('PySimpleGUI')
+
+from TMY_Clock import ClockEngine, tmy
+from stand_ins import StandInClock, StandInWindow, headless_clock, standin_gui, synthetic_tmy
+
+
+def test_closing_the_clock_window_mid_frame():
+    window = StandInWindow()
+    clock = StandInClock(close=True)
+    top = standin_gui(window, clock)
+    top.clock_frame()
+    assert top.clk == [] and top.stopped
+    assert clock.frames == 0
+    assert window['-PLAY-'].updates[-1][1] == {'disabled': False}
+
+
+@pytest.fixture(scope='module')
+def engine():
+    """ A running clock engine, warmed up so the minute series and pvlib are not in the timed frames"""
+    tz = timezone('America/New_York')
+    engine = ClockEngine(tmy(tz=tz, tmydata=synthetic_tmy()), tz.localize(datetime(2000, 6, 1)), None, 4096)
+    engine.face_color()
+    return engine
+
+
+@pytest.mark.parametrize('busy', [False, True])
+def test_clock_frames_keep_their_rate(engine, busy):
+    """ run_gui paces the clock frames on their own deadlines whether the control window is idle or sends an event
+        every 3 ms
+    """
+    fps = 60
+    engine.reset()
+    window = StandInWindow(event_interval=0.003 if busy else None)
+    top = standin_gui(window, StandInClock(headless_clock(engine)), fps)
+    end = time.perf_counter() + 0.5
+    while time.perf_counter() < end:
+        top.run_gui()
+
+    intervals = np.diff([f[0] for f in top.scheduler.frames])
+    assert top.scheduler.achieved_fps() == pytest.approx(fps, rel=0.1)
+    assert np.median(intervals) == pytest.approx(1 / fps, rel=0.1)
+    assert np.percentile(intervals, 99) < 2 / fps
+
+
+def test_background_load_failure_is_shown(monkeypatch):
+    import pvlib.pvsystem
+
+    def unreadable(name):
+        raise OSError('no module library %s' % name)
+    monkeypatch.setattr(pvlib.pvsystem, 'retrieve_sam', unreadable)
+    window = StandInWindow()
+    top = standin_gui(window, [])
+    top.modlistname = 'SandiaMod'
+    top.load_in_background()
+    assert [event for event, values in window.events] == ['-LOAD-FAILED-']
+
+    top.run_gui()
+    assert 'no module library SandiaMod' in window['-STATUS-'].updates[-1][0][0]
+
+    # nothing is posted to a closed window
+    top.state = 'CLOSED'
+    top.load_in_background()
+    assert window.events == []
+
+
+class RestartedClock(StandInClock):
+    """ A stopped clock window that records how Play reuses it"""
+    def __init__(self):
+        StandInClock.__init__(self)
+        self.calls = []
+
+    def set_module(self, module):
+        self.calls.append(('set_module', module))
+
+    def restart(self, starttime, endtime, speed=None):
+        self.calls.append(('restart', starttime, endtime, speed))
+
+
+def test_new_module_keeps_the_stopped_clock():
+    window = StandInWindow(values={'-START-': 'June 01', '-END-': 'June 08', '-SPEED-': '64', '-MODULES-': 'B',
+                                   '-RESUME-': False})
+    clock = RestartedClock()
+    top = standin_gui(window, clock)
+    top.cp = type('Picked', (), {'lat': 39.13, 'lng': -77.21})()
+    top.wall = []
+    top.modules = {'A': 'module A', 'B': 'module B'}
+    top.saved = None
+    top.stopped = True
+    top.clock_config = ([[39.13, -77.21]], False, 'A')
+
+    top.launch_clock()
+    assert top.clk is clock and not clock.pause
+    assert clock.calls == [('set_module', 'module B'), ('restart', datetime(1900, 6, 1), datetime(1900, 6, 8), 64)]
+    assert top.clock_config == ([[39.13, -77.21]], False, 'B')
@@ -0,0 +1,18 @@
+""" FrameProfiler: per frame counts next to the phase timings"""
+from instrumentation import FrameProfiler
+
+
+def test_counts_only_while_enabled():
+    profiler = FrameProfiler()
+    profiler.count('tk calls', 5)
+    assert profiler.counts() == {}
+
+    profiler.toggle(True)
+    for calls in (4, 1, 1):
+        profiler.count('tk calls', calls)
+    assert profiler.counts() == {'tk calls': (2.0, 4)}
+    assert 'tk calls' in profiler.report()
+
+    profiler.toggle(False)
+    profiler.toggle(True)
+    assert profiler.counts() == {}
@@ -0,0 +1,28 @@
+""" The gui opens without the heavy modules, pandas, pvlib and timezonefinder are imported when a clock is launched"""
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('pandas', 'pvlib', 'timezonefinder')
+
+
+def imported(module):
+    """ The heavy modules that importing module in a fresh interpreter loads"""
+    code = 'import sys, %s; print(" ".join(m for m in %r if m in sys.modules))' % (module, HEAVY)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+
+@pytest.mark.parametrize('module', ['session', 'city_index', 'prefetch', 'instrumentation', 'scheduler', 'time_source'])
+def test_gui_imports_are_light(module):
+    assert imported(module) == []
+
+
+@pytest.mark.skipif(importlib.util.find_spec('PySimpleGUI') is None, reason='PySimpleGUI is not installed')
+def test_ss_gui_is_light():
+    assert imported('ss_gui') == []
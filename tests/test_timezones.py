@@ -0,0 +1,35 @@
+""" timezones: bulk lookups"""
+import timezones
+
+
+class CountingFinder:
+    """ Stands in for the TimezoneFinderL, east of Greenwich is 'East', the rest 'West'"""
+    def __init__(self):
+        self.lookups = []
+
+    def timezone_at(self, lng, lat):
+        self.lookups.append((lat, lng))
+        return 'East' if lng > 0 else 'West'
+
+
+def test_tz_names_order_and_duplicates(monkeypatch):
+    finder = CountingFinder()
+    monkeypatch.setattr(timezones, 'finder', lambda: finder)
+    timezones._tz_name.cache_clear()
+    try:
+        lats = [10.0, 20.0, 10.00001, 30.0, 20.0]
+        lngs = [5.0, -5.0, 5.00001, 7.0, -5.0]
+        assert timezones.tz_names(lats, lngs) == ['East', 'West', 'East', 'East', 'West']
+        # the points within the rounding of each other are one lookup
+        assert sorted(finder.lookups) == [(10.0, 5.0), (20.0, -5.0), (30.0, 7.0)]
+        assert timezones.tz_names([], []) == []
+    finally:
+        timezones._tz_name.cache_clear()
+
+
+def test_tz_names_match_tz_name():
+    lats = [39.13, 38.72, 39.13, -34.93]
+    lngs = [-77.21, -9.14, -77.21, 138.6]
+    names = timezones.tz_names(lats, lngs)
+    assert names == ['America/New_York', 'Europe/Lisbon', 'America/New_York', 'Australia/Adelaide']
+    assert names == [timezones.tz_name(lat, lng) for lat, lng in zip(lats, lngs)]
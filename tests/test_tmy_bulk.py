@@ -0,0 +1,16 @@
+""" tmy_bulk: the survey summary"""
+import numpy as np
+
+from stand_ins import synthetic_tmy
+from tmy_bulk import TmyStack, normalize
+
+
+def test_summary_has_the_timezone_of_each_site():
+    row = normalize(synthetic_tmy()[0])
+    lats, lngs = [39.13, 38.72, 39.13], [-77.21, -9.14, -77.21]
+    stack = TmyStack(lats, lngs, ['Gaithersburg', 'Lisbon', 'Gaithersburg again'],
+                     {c: np.repeat(row[c][None, :], 3, axis=0) for c in row}, {})
+    summary = stack.summary()
+    assert summary['timezone'].tolist() == ['America/New_York', 'Europe/Lisbon', 'America/New_York']
+    assert (summary['annual kWh/m2'] > 0).all()
+    assert summary['error'].tolist() == ['', '', '']
@@ -0,0 +1,69 @@
+""" tmy_cache: reading back seeded data, offline misses, LRU eviction and read-only cache directories"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stand_ins import synthetic_tmy
+from tmy_cache import tmy_cache, TmyCacheMiss
+
+LAT, LNG = 39.13, -77.21
+
+
+def no_download(lat, lng):
+    raise AssertionError('downloaded %s, %s' % (lat, lng))
+
+
+@pytest.fixture
+def data():
+    return synthetic_tmy()[0]
+
+
+def test_seeded_data_reads_back(tmp_path, data):
+    tmy_cache(cachedir=str(tmp_path)).seed(LAT, LNG, data)
+    # a fresh cache has an empty memo, so this comes from the file
+    cache = tmy_cache(cachedir=str(tmp_path), backend=no_download)
+    cached = cache.get(LAT + 0.001, LNG - 0.001)[0]
+    assert (cached.index == data.index).all()
+    pd.testing.assert_frame_equal(cached.reset_index(drop=True), data.reset_index(drop=True))
+    # a copy, the caller may modify it
+    cached['ghi'] = 0.0
+    assert cache.get(LAT, LNG)[0]['ghi'].max() > 0
+
+
+def test_offline_miss(tmp_path, data):
+    cache = tmy_cache(cachedir=str(tmp_path), offline=True, backend=no_download)
+    with pytest.raises(TmyCacheMiss):
+        cache.get(LAT, LNG)
+    cache.seed(LAT, LNG, data)
+    assert len(cache.get(LAT, LNG)[0]) == len(data)
+
+
+def test_least_recently_used_is_evicted(tmp_path, data):
+    cache = tmy_cache(cachedir=str(tmp_path), memo_size=1, backend=no_download)
+    cache.seed(0, 0, data)
+    size = os.path.getsize(cache.path(cache.key(0, 0)))
+    cache.maxbytes = 2.5 * size
+    cache.seed(1, 1, data)
+    # touch the first so the second is the oldest
+    past = os.path.getmtime(cache.path(cache.key(1, 1))) - 10
+    os.utime(cache.path(cache.key(1, 1)), (past, past))
+    cache.memo.clear()
+    cache.get(0, 0)
+    cache.seed(2, 2, data)
+
+    assert os.path.exists(cache.path(cache.key(0, 0)))
+    assert not os.path.exists(cache.path(cache.key(1, 1)))
+    assert os.path.exists(cache.path(cache.key(2, 2)))
+    assert sum(os.path.getsize(e.path) for e in os.scandir(str(tmp_path))) <= cache.maxbytes
+
+
+def test_read_only_cache_hit(tmp_path, data, monkeypatch):
+    tmy_cache(cachedir=str(tmp_path)).seed(LAT, LNG, data)
+    cache = tmy_cache(cachedir=str(tmp_path), offline=True)
+
+    def read_only(path, *args):
+        raise PermissionError(13, 'Read-only file system', path)
+    monkeypatch.setattr(os, 'utime', read_only)
+    np.testing.assert_array_equal(cache.get(LAT, LNG)[0]['ghi'].to_numpy(), data['ghi'].to_numpy())
@@ -0,0 +1,39 @@
+""" tmy: the coercion of the PVGIS index to the year 2000 and the rounding to local hours"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from pytz import timezone
+
+from TMY_Clock import tmy
+from stand_ins import synthetic_tmy
+
+
+def test_coerce_tmy_year():
+    frame = synthetic_tmy()[0]
+    years = set(frame.index.year)
+    coerced = tmy.coerce_tmy_year((frame.copy(),))[0]
+    assert len(years) > 1
+    assert set(coerced.index.year) == {2000}
+    np.testing.assert_array_equal(coerced.index.month, frame.index.month)
+    np.testing.assert_array_equal(coerced.index.day, frame.index.day)
+    np.testing.assert_array_equal(coerced.index.hour, frame.index.hour)
+
+
+@pytest.mark.parametrize('zone', ['America/New_York', 'Asia/Kolkata', 'Australia/Adelaide', 'Asia/Kathmandu', 'UTC'])
+def test_round_to_nearest_hour(zone):
+    tz = timezone(zone)
+    utc_index = pd.date_range('2000-01-01 00:10', periods=366 * 24, freq='h', tz='UTC')
+    index = utc_index.tz_convert(tz)
+    rounded = tmy.round_to_nearest_hour(index)
+
+    # every row is on a local hour and within half an hour of the original, also across the DST changes
+    assert (rounded.minute == 0).all() and (rounded.second == 0).all()
+    assert (abs(rounded - index) <= timedelta(minutes=30)).all()
+
+    # away from DST changes, the same as rounding each local time on its own
+    wall = index.tz_localize(None)
+    expected = [t.replace(minute=0, second=0) + timedelta(hours=1) if t.minute >= 30 else t.replace(minute=0, second=0)
+                for t in wall[:48]]
+    np.testing.assert_array_equal(rounded.tz_localize(None)[:48], pd.DatetimeIndex(expected))
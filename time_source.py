@@ -0,0 +1,39 @@
+""" time_source.py
+    Where a ClockEngine gets its wall time from, as integer nanoseconds.
+
+    RealTimeSource follows time.monotonic_ns, which never jumps with system clock changes.  FixedStepSource advances
+    a fixed step per frame whatever the wall time, so an accelerated run is the same every time and can be stepped as
+    fast as the CPU allows:
+
+        engine = ClockEngine(tmydata, starttime, endtime, speed=3600, source=FixedStepSource(1 / 60))
+        while not engine.pause:
+            engine.advance()
+"""
+
+import time
+
+NS = 1000000000
+
+
+class RealTimeSource:
+    """ Monotonic wall time"""
+
+    def now_ns(self):
+        return time.monotonic_ns()
+
+
+class FixedStepSource:
+    """ Every call to now_ns() is one frame of step seconds after the previous one"""
+
+    def __init__(self, step=1 / 60, start_ns=0):
+        """
+        :param step:     Seconds per frame, rounded to whole nanoseconds
+        :param start_ns: Time of the first frame
+        """
+        self.step_ns = int(round(step * NS))
+        self.t = start_ns
+
+    def now_ns(self):
+        t = self.t
+        self.t += self.step_ns
+        return t
@@ -1,13 +1,55 @@
 """ timezones.py
     Constructor finds the timezone from latituse and longitude.
     a method replace_dt_tz() iterates through a list of datettime objects and replaces the timezone
+
+    The TimezoneFinderL is created once per process, on first use, and shared.  Lookups are cached by the lat and lng
+    rounded to 4 decimals (about 10 m), tz_names() resolves many coordinates at once.
 """
 
+import threading
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
 from pytz import timezone, utc
 from pytz.exceptions import UnknownTimeZoneError
 
-from timezonefinder import TimezoneFinderL
+_finder = None
+_finder_lock = threading.Lock()
+
+
+def finder():
+    """ The shared TimezoneFinderL, loaded on the first call"""
+    global _finder
+    if _finder is None:
+        with _finder_lock:
+            if _finder is None:
+                from timezonefinder import TimezoneFinderL
+                _finder = TimezoneFinderL()
+    return _finder
+
+
+@lru_cache(maxsize=4096)
+def _tz_name(lat, lng):
+    return finder().timezone_at(lng=lng, lat=lat)
+
+
+def tz_name(lat, lng, decimals=4):
+    """ Timezone name at the location, e.g. 'America/New_York'"""
+    return _tz_name(round(float(lat), decimals), round(float(lng), decimals))
+
+
+def tz_names(lats, lngs, decimals=4):
+    """ Timezone names of many locations, each distinct rounded location is looked up once
+
+    :param lats: sequence of latitudes
+    :param lngs: sequence of longitudes, same length
+    :return: list of timezone names
+    """
+    points = np.round(np.column_stack([np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)]), decimals)
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    names = [_tz_name(float(lat), float(lng)) for lat, lng in unique]
+    return [names[i] for i in inverse.ravel()]
 
 class timezones:
     """
@@ -17,9 +59,7 @@ class timezones:
 
 
     def __init__(self, lat, lng):
-        tf = TimezoneFinderL()
-        self.tz = tf.timezone_at(lng=lng, lat=lat)
-        del tf
+        self.tz = tz_name(lat, lng)
 
     def get_tz(self):
         return self.tz
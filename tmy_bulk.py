@@ -0,0 +1,209 @@
+""" tmy_bulk.py
+    TMY data of many locations at once, for site surveys.
+
+    fetch_many() gets the locations through a tmy_cache on a bounded pool of worker threads, each location is
+    downloaded at most once and lands in the cache for the clocks.  Parsing a PVGIS response holds the GIL for about
+    0.2 s, so with processes=True the downloads run in a pool of worker processes instead and the threads only wait
+    on the network.
+
+    The years are normalized onto one UTC hourly grid of the year 2000 (8784 hours, Feb 29 repeats Feb 28) and
+    stacked as float32 arrays of locations x hours, so comparisons across all sites are single numpy expressions:
+
+        stack = fetch_many(lats, lngs, names, workers=8)
+        daily = stack.daily_insolation()       # kWh/m2, locations x 366
+        print(stack.summary().sort_values('annual kWh/m2'))     # with the timezone of each site
+
+    From the command line, the cities of a country in worldcities.csv:
+
+        python tmy_bulk.py --country Portugal --limit 200 --workers 8 --out portugal.csv
+"""
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+HOURS = 366 * 24
+COLUMNS = ('ghi', 'dni', 'dhi', 'temp_air')
+SITE_BYTES = 2 ** 20        # room for one location's cache file (about 0.7 MB)
+YEAR_START = np.datetime64('2000-01-01', 'D')
+
+
+class TmyStack:
+    """
+    The TMY years of many locations on one UTC hourly grid, float32 locations x 8784 per column.  Rows of the
+    locations that failed are NaN and their exception is in errors.
+    """
+
+    def __init__(self, lats, lngs, names, columns, errors):
+        """
+        :param lats:    array of latitudes
+        :param lngs:    array of longitudes
+        :param names:   list of location names
+        :param columns: {column: float32 array locations x HOURS}
+        :param errors:  {location number: exception}
+        """
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.names = list(names)
+        self.columns = columns
+        self.errors = errors
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def times(self):
+        """ UTC DatetimeIndex of the hours"""
+        return pd.date_range('2000-01-01', periods=HOURS, freq='h', tz='UTC')
+
+    @property
+    def ok(self):
+        """ Bool array of the locations that were fetched"""
+        ok = np.ones(len(self), dtype=bool)
+        ok[list(self.errors)] = False
+        return ok
+
+    def daily_insolation(self, column='ghi'):
+        """ kWh/m2 of each day of the year at each location, float64 locations x 366.
+
+            The days run midnight to midnight of local mean solar time (UTC + lng / 15 hours, rounded) so the
+            daylight of a day is never split between two of them.
+        """
+        offset = np.rint(self.lngs / 15).astype(np.intp)
+        local = (np.arange(HOURS)[None, :] - offset[:, None]) % HOURS
+        values = np.take_along_axis(self.columns[column], local, axis=1)
+        return values.reshape(len(self), 366, 24).sum(axis=2, dtype=np.float64) / 1000
+
+    def summary(self, column='ghi'):
+        """ Data frame of the timezone and the annual and daily insolation of each location, one row per location"""
+        from timezones import tz_names
+
+        daily = self.daily_insolation(column)
+        return pd.DataFrame({
+            'lat': self.lats,
+            'lng': self.lngs,
+            'timezone': tz_names(self.lats, self.lngs),
+            'annual kWh/m2': daily.sum(axis=1),
+            'mean daily kWh/m2': daily.mean(axis=1),
+            'min daily kWh/m2': daily.min(axis=1),
+            'max daily kWh/m2': daily.max(axis=1),
+            'error': [repr(self.errors[n]) if n in self.errors else '' for n in range(len(self))],
+        }, index=pd.Index(self.names, name='name'))
+
+
+def normalize(data, columns=COLUMNS):
+    """ One location's TMY data frame as {column: float32 array of the HOURS of the year 2000}.
+
+    Each row keeps its UTC month, day and hour whatever year PVGIS took the month from; missing columns are NaN.
+    """
+    wall = data.index.tz_convert('UTC').tz_localize(None)
+    months = np.datetime64('2000-01', 'M') + (wall.month.to_numpy() - 1)
+    days = (months.astype('datetime64[D]') + (wall.day.to_numpy() - 1) - YEAR_START).astype(np.int64)
+    hours = np.rint((wall - wall.normalize()) / pd.Timedelta(hours=1)).astype(np.int64)
+    row = (days * 24 + hours) % HOURS
+
+    feb28 = slice(58 * 24, 59 * 24)
+    feb29 = slice(59 * 24, 60 * 24)
+    out = {}
+    for column in columns:
+        values = np.full(HOURS, np.nan, dtype=np.float32)
+        if column in data:
+            values[row] = data[column].to_numpy(dtype=np.float32)
+            missing = np.isnan(values[feb29])
+            values[feb29][missing] = values[feb28][missing]
+        out[column] = values
+    return out
+
+
+def fetch_many(lats, lngs, names=None, cache=None, workers=8, columns=COLUMNS, processes=False):
+    """ Fetches and stacks the TMY data of many locations.
+
+    :param lats:    sequence of latitudes
+    :param lngs:    sequence of longitudes
+    :param names:   sequence of names, defaults to 'lat, lng'
+    :param cache:   tmy_cache to fetch through, defaults to one on the shared cache directory sized to hold all the
+                    locations, so a survey never evicts its own earlier sites
+    :param workers: Size of the worker pool, the number of downloads running at once
+    :param columns: tmy columns to stack
+    :param processes: Bool, download in a pool of worker processes, the cache backend must be picklable
+    :return: TmyStack
+    """
+    if cache is None:
+        from tmy_cache import default_cache, tmy_cache
+        cache = tmy_cache(default_cache.cachedir, max(default_cache.maxbytes, len(lats) * SITE_BYTES),
+                          offline=default_cache.offline, decimals=default_cache.decimals, backend=default_cache.backend)
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if names is None:
+        names = ['%.2f, %.2f' % location for location in zip(lats, lngs)]
+
+    downloads = ProcessPoolExecutor(max_workers=workers) if processes else None
+
+    def load(key):
+        if downloads is None:
+            return normalize(cache.get(*key)[0], columns)
+        data = cache.lookup(key)
+        if data is None:
+            if cache.offline:
+                return normalize(cache.get(*key)[0], columns)     # raises the TmyCacheMiss
+            data = downloads.submit(cache.backend, *key).result()
+            cache.seed(key[0], key[1], data)
+        return normalize(data, columns)
+
+    # locations sharing a cache key are fetched once
+    keys = [cache.key(lat, lng) for lat, lng in zip(lats, lngs)]
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tmy-bulk') as pool:
+            futures = {key: pool.submit(load, key) for key in dict.fromkeys(keys)}
+    finally:
+        if downloads is not None:
+            downloads.shutdown()
+
+    stacked = {column: np.full((len(keys), HOURS), np.nan, dtype=np.float32) for column in columns}
+    errors = {}
+    for n, key in enumerate(keys):
+        try:
+            rows = futures[key].result()
+        except Exception as e:
+            errors[n] = e
+            continue
+        for column in columns:
+            stacked[column][n] = rows[column]
+    return TmyStack(lats, lngs, names, stacked, errors)
+
+
+def main(argv=None):
+    from city_index import city_index
+    from tmy_cache import tmy_cache, pvgis_backend
+
+    parser = argparse.ArgumentParser(description='Annual and daily insolation of many cities from their TMY data')
+    parser.add_argument('--csv', default='worldcities.csv')
+    parser.add_argument('--country', default=None, help='only the cities of this country')
+    parser.add_argument('--limit', type=int, default=None, help='at most this many cities')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--processes', action='store_true', help='download in worker processes')
+    parser.add_argument('--cache-mb', type=float, default=None,
+                        help='size bound of the tmy cache directory, default 1 MB per city and at least 64 MB')
+    parser.add_argument('--url', default=None, help='PVGIS compatible api to download from')
+    parser.add_argument('--out', default='-', help="csv file to write, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    labels, lats, lngs = city_index(args.csv).sites(args.country)
+    labels, lats, lngs = labels[:args.limit], lats[:args.limit], lngs[:args.limit]
+    if args.cache_mb is None:
+        maxbytes = max(64 * 2 ** 20, len(lats) * SITE_BYTES)
+    else:
+        maxbytes = int(args.cache_mb * 2 ** 20)
+    cache = tmy_cache(maxbytes=maxbytes, backend=partial(pvgis_backend, url=args.url))
+    stack = fetch_many(lats, lngs, labels, cache=cache, workers=args.workers, processes=args.processes)
+    stack.summary().to_csv(sys.stdout if args.out == '-' else args.out)
+    if stack.errors:
+        print('%d of %d locations failed' % (len(stack.errors), len(stack)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
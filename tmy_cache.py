@@ -0,0 +1,162 @@
+""" tmy_cache.py
+    Persistent cache of PVGIS TMY downloads so a location that has been seen before loads from disk instead of the
+    network.  Each location is one uncompressed .npz file (one array per column) named after the lat and lng
+    rounded to 2 decimals.  The cache directory is bounded in bytes, least recently used files are removed first.
+    A small in-process memo sits on top of the files so relaunching a clock in the same session skips the disk too.
+
+    Misses are downloaded by the backend, a callable (lat, lng) -> data frame.  The default is pvgis_backend, pass
+    functools.partial(pvgis_backend, url=...) to use a mirror, or any function for tests and benchmarks.
+
+    Environment:
+        TMY_CACHE_DIR   directory of the cache files, default ~/.cache/tmy_clock
+        TMY_OFFLINE     set to 1 to never touch the network, a location missing from the cache raises TmyCacheMiss
+"""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class TmyCacheMiss(LookupError):
+    """ Raised in offline mode when the location is not in the cache"""
+
+
+def pvgis_backend(lat, lng, url=None, timeout=30):
+    """ Downloads the TMY data frame of a location from PVGIS, or from the PVGIS compatible api at url"""
+    from pvlib import iotools    # only needed on a cache miss
+    kwargs = {} if url is None else {'url': url}
+    return iotools.get_pvgis_tmy(lat, lng, map_variables=True, timeout=timeout, **kwargs)[0]
+
+
+class tmy_cache:
+    """
+    Looks up TMY data by location: in-process memo first, then the cache directory, then PVGIS.
+
+    get() returns a tuple shaped like iotools.get_pvgis_tmy() with the data frame in position 0.  The frame is a
+    copy, callers are free to modify it.
+    """
+
+    def __init__(self, cachedir=None, maxbytes=64 * 2**20, memo_size=8, offline=None, decimals=2, backend=None):
+        """
+        :param cachedir:  Directory holding the cache files, created if needed
+        :param maxbytes:  Size bound of the cache directory in bytes
+        :param memo_size: Number of locations kept in memory
+        :param offline:   Bool, never download.  Defaults to the TMY_OFFLINE environment variable
+        :param decimals:  Lat and lng are rounded to this many decimals to form the cache key
+        :param backend:   Callable (lat, lng) returning the TMY data frame of a cache miss, defaults to pvgis_backend
+        """
+        if cachedir is None:
+            cachedir = os.environ.get('TMY_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'tmy_clock'))
+        if offline is None:
+            offline = os.environ.get('TMY_OFFLINE', '0') not in ('', '0')
+        self.cachedir = cachedir
+        self.maxbytes = maxbytes
+        self.memo_size = memo_size
+        self.offline = offline
+        self.decimals = decimals
+        self.backend = backend if backend is not None else pvgis_backend
+        self.memo = OrderedDict()
+        self.lock = threading.Lock()    # the memo is shared with prefetch worker threads
+
+    def key(self, lat, lng):
+        return (round(float(lat), self.decimals), round(float(lng), self.decimals))
+
+    def path(self, key):
+        return os.path.join(self.cachedir, 'tmy_%+.*f_%+.*f.npz' % (self.decimals, key[0], self.decimals, key[1]))
+
+    def get(self, lat, lng):
+        """ TMY tuple for the location, downloading and storing it only if it is not cached"""
+        key = self.key(lat, lng)
+        data = self.lookup(key)
+        if data is None:
+            if self.offline:
+                raise TmyCacheMiss('no cached TMY data for lat=%s lng=%s' % key)
+            data = self.backend(key[0], key[1])
+            self.seed(key[0], key[1], data)
+        return data.copy(), None, None, None
+
+    def lookup(self, key):
+        """ Data frame of the key from the memo or the cache files, None if it would have to be downloaded"""
+        with self.lock:
+            data = self.memo.get(key)
+        if data is None:
+            data = self.load(key)
+            if data is None:
+                return None
+        self.remember(key, data)
+        return data
+
+    def seed(self, lat, lng, data):
+        """ Stores a TMY data frame for the location, e.g. to prepare a cache for offline use"""
+        key = self.key(lat, lng)
+        os.makedirs(self.cachedir, exist_ok=True)
+        arrays = {'index': np.array(data.index.tz_convert('UTC').tz_localize(None), dtype='datetime64[s]').astype(np.int64),
+                  'columns': np.array([str(c) for c in data.columns])}
+        for n, c in enumerate(data.columns):
+            arrays['c%d' % n] = data[c].to_numpy()
+        # write to a temporary file first so a reader never sees a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.cachedir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.path(key))
+        self.remember(key, data)
+        self.evict()
+
+    def load(self, key):
+        """ Reads the cache file for the key, None if there isn't one"""
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                index = pd.to_datetime(z['index'], unit='s', utc=True)
+                columns = z['columns'].tolist()
+                data = pd.DataFrame({c: z['c%d' % n] for n, c in enumerate(columns)}, index=index)
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            os.utime(path)     # mark as recently used
+        except OSError:
+            pass               # a read-only seeded cache is still served
+        return data
+
+    def remember(self, key, data):
+        with self.lock:
+            self.memo[key] = data
+            self.memo.move_to_end(key)
+            while len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+
+    def evict(self):
+        """ Removes the least recently used files until the cache directory is within maxbytes"""
+        files = []
+        for entry in os.scandir(self.cachedir):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:   # evicted by another thread
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(f[1] for f in files)
+        for mtime, size, path in sorted(files):
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            self.memo.clear()
+        if os.path.isdir(self.cachedir):
+            for entry in os.scandir(self.cachedir):
+                if entry.name.endswith('.npz'):
+                    os.remove(entry.path)
+
+
+# shared by every tmy object in the process
+default_cache = tmy_cache()
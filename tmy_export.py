@@ -0,0 +1,108 @@
+""" tmy_export.py
+    Streams the irradiance a clock run would show, at a fixed simulated time step, for driving the solar array
+    simulator from a precomputed profile.  No gui is involved so it runs as fast as numpy allows.
+
+    samples() is a generator of DataFrame chunks, the writers consume it:
+
+        engine = ClockEngine.for_location(39.13, -77.21, datetime(2000, 6, 1), datetime(2000, 6, 8))
+        write_csv(samples(engine, step=60, columns=('ghi', 'dni', 'dhi', 'temp_air')), 'profile.csv')
+
+    From the command line, '-' writes csv to stdout:
+
+        python tmy_export.py --start "June 01" --end "June 08" --step 60 --columns dni,dhi,temp_air --out -
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def samples(engine, step=60, columns=('ghi',), chunk=1440, duration=None):
+    """ Generator of the run of a ClockEngine sampled every step simulated seconds.
+
+    :param engine:   ClockEngine, the run starts at its starttime and lasts until its endtime
+    :param step:     Simulated seconds between samples
+    :param columns:  tmy columns to interpolate, ghi and any of dni, dhi, temp_air, ...
+    :param chunk:    Samples per yielded DataFrame
+    :param duration: Simulated seconds to export, required when the engine has no endtime
+    :return: DataFrames indexed by the local display time, with an 'elapsed' seconds column and the tmy columns
+    """
+    if duration is None:
+        duration = engine.span
+    if duration is None:
+        raise ValueError('the engine runs indefinitely, give a duration')
+    count = int(duration // step) + 1
+    for first in range(0, count, chunk):
+        elapsed = np.arange(first, min(first + chunk, count)) * float(step)
+        epoch = engine.display_epoch(elapsed)
+        data = {'elapsed': elapsed}
+        for column in columns:
+            # the ghi the clock shows, from the minute series
+            data[column] = engine.tmy.ghi_many(epoch) if column == 'ghi' else engine.tmy.values_many(column, epoch)
+        index = pd.to_datetime(epoch, unit='s', utc=True).tz_convert(engine.tz)
+        index.name = 'time'
+        yield pd.DataFrame(data, index=index)
+
+
+def write_csv(chunks, out):
+    """ Writes the chunks as one csv, out is a path or an open text file"""
+    f = open(out, 'w', newline='') if isinstance(out, str) else out
+    try:
+        for n, data in enumerate(chunks):
+            data.to_csv(f, header=(n == 0))
+    finally:
+        if f is not out:
+            f.close()
+
+
+def write_parquet(chunks, path):
+    """ Writes the chunks as one parquet file, one row group per chunk.  Needs pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('parquet export needs pyarrow, pip install pyarrow') from None
+    writer = None
+    try:
+        for data in chunks:
+            table = pa.Table.from_pandas(data)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def main(argv=None):
+    from TMY_Clock import ClockEngine
+
+    parser = argparse.ArgumentParser(description='Export the TMY irradiance profile of a clock run')
+    parser.add_argument('--lat', type=float, default=39.13)
+    parser.add_argument('--lng', type=float, default=-77.21)
+    parser.add_argument('--start', default=datetime.today().strftime('%B %d'), help="e.g. 'June 01'")
+    parser.add_argument('--end', default=None, help="e.g. 'June 08', before start means next year")
+    parser.add_argument('--step', type=float, default=60, help='simulated seconds between samples')
+    parser.add_argument('--columns', default='', help='extra tmy columns, e.g. dni,dhi,temp_air')
+    parser.add_argument('--format', choices=('csv', 'parquet'), default=None, help='defaults from the --out suffix')
+    parser.add_argument('--out', default='-', help="file to write, '-' for csv on stdout")
+    args = parser.parse_args(argv)
+
+    starttime = datetime.strptime(args.start, '%B %d')
+    endtime = datetime.strptime(args.end, '%B %d') if args.end else starttime
+    engine = ClockEngine.for_location(args.lat, args.lng, starttime, endtime)
+    columns = ['ghi'] + [c for c in args.columns.split(',') if c and c != 'ghi']
+    chunks = samples(engine, step=args.step, columns=columns)
+
+    fmt = args.format or ('parquet' if args.out.endswith('.parquet') else 'csv')
+    if fmt == 'parquet':
+        write_parquet(chunks, args.out)
+    else:
+        write_csv(chunks, sys.stdout if args.out == '-' else args.out)
+
+
+if __name__ == '__main__':
+    main()